@@ -0,0 +1,191 @@
+"""Воспроизводимый набор данных для замеров.
+
+Одни и те же объёмы и seed дают те же имена, тексты, связи и
+смещения дат, поэтому замеры разных коммитов идут на одинаковых данных.
+Пользователи и группы собираются mixer, тексты постов и комментариев
+берутся из пула предложений Faker: на миллионах строк blend на каждую
+строку слишком медленный. Всё пишется bulk_create пачками, а то, что
+делали бы пропущенные сигналы (профили, счётчики, ленты подписок),
+в конце пересобирается командами обслуживания.
+
+Популярность авторов распределена по закону Ципфа: немногие авторы
+пишут большую часть постов и собирают большую часть подписчиков.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from mixer.backend.django import Mixer
+
+from posts import timeline
+from posts.counters import reconcile_posts, reconcile_profiles
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import explicit_dates
+
+User = get_user_model()
+
+BATCH_SIZE: int = 5000
+TEXT_POOL_SIZE: int = 2000
+GROUP_SHARE: float = 0.8
+VOLUMES = {
+    'users': 1000,
+    'groups': 50,
+    'posts': 20000,
+    'comments': 50000,
+    'follows': 20,
+}
+
+
+class DataGenerator:
+    """Наполняет базу пользователями, группами, постами и подписками.
+
+    follows — среднее число подписок на пользователя.
+    """
+
+    def __init__(self, seed=0, days=365, batch_size=BATCH_SIZE,
+                 log=None):
+        self.random = random.Random(seed)
+        self.mixer = Mixer(commit=False, locale='ru')
+        self.mixer.faker.seed_instance(seed)
+        self.days = days
+        self.batch_size = batch_size
+        self.end = timezone.now()
+        self.log = log or (lambda message: None)
+
+    def generate(self, users, groups, posts, comments, follows):
+        user_ids = self.create_users(users)
+        group_ids = self.create_groups(groups)
+        # Популярные авторы не должны совпадать с первыми id.
+        authors = list(user_ids)
+        self.random.shuffle(authors)
+        weights = list(accumulate(
+            1 / rank for rank in range(1, len(authors) + 1)
+        ))
+        texts = self.text_pool()
+        post_ids = self.create_posts(posts, authors, weights, group_ids,
+                                     texts)
+        self.create_comments(comments, post_ids, user_ids, texts)
+        self.create_follows(follows, user_ids, authors, weights)
+        self.log('Пересборка профилей, счётчиков и лент подписок')
+        reconcile_profiles(self.batch_size)
+        reconcile_posts(self.batch_size)
+        timeline.rebuild()
+
+    def date(self):
+        seconds = self.random.uniform(0, self.days * 24 * 60 * 60)
+        return self.end - timedelta(seconds=seconds)
+
+    def text_pool(self):
+        return [
+            self.mixer.faker.text(max_nb_chars=self.random.randint(40, 400))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+
+    def save(self, model, objects, total):
+        """Пишет объекты пачками и возвращает диапазон их новых id.
+
+        Новые строки одного писателя получают подряд идущие id больше
+        прежнего максимума, так что диапазона достаточно и на
+        миллионах строк, где список id не поместился бы в память.
+        """
+        before = model.objects.aggregate(last=Max('pk'))['last'] or 0
+        objects = iter(objects)
+        saved = 0
+        batch = list(islice(objects, self.batch_size))
+        while batch:
+            with transaction.atomic():
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+            saved += len(batch)
+            self.log(f'{model._meta.verbose_name_plural}: {saved}/{total}')
+            batch = list(islice(objects, self.batch_size))
+        added = model.objects.filter(pk__gt=before).aggregate(
+            first=Min('pk'), last=Max('pk')
+        )
+        if added['first'] is None:
+            return range(0)
+        return range(added['first'], added['last'] + 1)
+
+    def create_users(self, count):
+        first = (User.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        users = (
+            self.mixer.blend(
+                User,
+                username=f'bench{first + number}',
+                password='!',
+                date_joined=self.date(),
+                is_staff=False,
+                is_superuser=False,
+            )
+            for number in range(count)
+        )
+        return self.save(User, users, count)
+
+    def create_groups(self, count):
+        first = (Group.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        groups = (
+            self.mixer.blend(
+                Group,
+                title=self.mixer.faker.catch_phrase()[:200],
+                slug=f'bench-{first + number}',
+                description=self.mixer.faker.paragraph(),
+            )
+            for number in range(count)
+        )
+        return self.save(Group, groups, count)
+
+    def create_posts(self, count, authors, weights, group_ids, texts):
+        def posts():
+            for author_id in self.choices(authors, weights, count):
+                group_id = None
+                if group_ids and self.random.random() < GROUP_SHARE:
+                    group_id = self.random.choice(group_ids)
+                yield Post(
+                    text=self.random.choice(texts),
+                    author_id=author_id,
+                    group_id=group_id,
+                    pub_date=self.date(),
+                )
+        with explicit_dates(Post._meta.get_field('pub_date')):
+            return self.save(Post, posts(), count)
+
+    def create_comments(self, count, post_ids, user_ids, texts):
+        if not post_ids or not user_ids:
+            return
+        # Свежие посты (большие id) комментируют чаще старых.
+        comments = (
+            Comment(
+                post_id=post_ids[int(
+                    len(post_ids) * self.random.random() ** 0.5
+                )],
+                author_id=self.random.choice(user_ids),
+                text=self.random.choice(texts),
+                created=self.date(),
+            )
+            for _ in range(count)
+        )
+        with explicit_dates(Comment._meta.get_field('created')):
+            self.save(Comment, comments, count)
+
+    def create_follows(self, average, user_ids, authors, weights):
+        def follows():
+            for user_id in user_ids:
+                wanted = self.random.randint(0, average * 2)
+                chosen = set(self.choices(authors, weights, wanted))
+                chosen.discard(user_id)
+                for author_id in sorted(chosen):
+                    yield Follow(user_id=user_id, author_id=author_id)
+        total = len(user_ids) * average
+        self.save(Follow, follows(), total)
+
+    def choices(self, population, cum_weights, count):
+        """Выборка с повторами, которая не держит в памяти весь результат."""
+        while count > 0:
+            size = min(count, self.batch_size)
+            yield from self.random.choices(
+                population, cum_weights=cum_weights, k=size
+            )
+            count -= size
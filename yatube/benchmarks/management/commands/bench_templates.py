@@ -0,0 +1,79 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks import rendering
+
+BASELINE = os.path.join(
+    os.path.dirname(rendering.__file__), 'template_baseline.json'
+)
+
+
+class Command(BaseCommand):
+    help = 'Замеряет отрисовку шаблонов и сравнивает с базовой линией'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=rendering.ITERATIONS,
+            help='Сколько раз отрисовать каждый шаблон',
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=rendering.PAGINATION,
+            help='Сколько постов на странице ленты',
+        )
+        parser.add_argument(
+            '--text-length',
+            type=int,
+            default=rendering.TEXT_LENGTH,
+            help='Длина текста каждого поста',
+        )
+        parser.add_argument(
+            '--template',
+            action='append',
+            dest='names',
+            help='Имя случая; по умолчанию все',
+        )
+        parser.add_argument('--baseline', default=BASELINE)
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=rendering.THRESHOLD,
+            help='Во сколько раз шаблон может подорожать без ошибки',
+        )
+        parser.add_argument(
+            '--save-baseline',
+            action='store_true',
+            help='Записать результат как новую базовую линию',
+        )
+
+    def handle(self, *args, **options):
+        report = rendering.run(
+            iterations=options['iterations'],
+            size=options['size'],
+            text_length=options['text_length'],
+            names=options['names'],
+        )
+        self.stdout.write(json.dumps(report, indent=2, ensure_ascii=False))
+        if options['save_baseline']:
+            with open(options['baseline'], 'w') as baseline:
+                json.dump(report, baseline, indent=2, ensure_ascii=False)
+                baseline.write('\n')
+            return
+        if not os.path.exists(options['baseline']):
+            return
+        with open(options['baseline']) as baseline:
+            flagged = rendering.regressions(
+                json.load(baseline), report, options['threshold']
+            )
+        for name, metrics in sorted(flagged.items()):
+            for metric, (before, after) in metrics.items():
+                self.stderr.write(f'{name}: {metric} {before} -> {after}')
+        if flagged:
+            raise CommandError(
+                f'Подорожали шаблоны: {", ".join(sorted(flagged))}'
+            )
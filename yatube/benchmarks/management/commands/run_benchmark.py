@@ -0,0 +1,61 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.runner import compare, run
+
+
+class Command(BaseCommand):
+    help = 'Замеряет задержки всех страниц posts.urls и пишет отчёт в JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100,
+            help='Сколько запросов делать к каждой странице',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Сколько запросов выполнять одновременно',
+        )
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--base-url',
+            help='Адрес запущенного сервера; без него — тестовый клиент',
+        )
+        parser.add_argument(
+            '--url-name',
+            action='append',
+            dest='names',
+            help='Имя URL из posts.urls; по умолчанию все',
+        )
+        parser.add_argument('--output', help='Куда записать отчёт')
+        parser.add_argument(
+            '--compare',
+            help='Отчёт прошлого прогона для сравнения p95',
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('Нужен хотя бы один запрос и один поток')
+        report = run(
+            requests_per_url=options['requests'],
+            concurrency=options['concurrency'],
+            warmup=options['warmup'],
+            base_url=options['base_url'],
+            names=options['names'],
+        )
+        text = json.dumps(report, indent=2, ensure_ascii=False)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(text)
+        else:
+            self.stdout.write(text)
+        if options['compare']:
+            with open(options['compare']) as baseline:
+                changes = compare(json.load(baseline), report)
+            for name, change in sorted(changes.items()):
+                self.stdout.write(f'{name}: p95 {change:+.1%}')
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from benchmarks.data import BATCH_SIZE, VOLUMES, DataGenerator
+
+
+class Command(BaseCommand):
+    help = 'Наполняет базу воспроизводимым набором данных для замеров'
+
+    def add_arguments(self, parser):
+        for name, default in VOLUMES.items():
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Один seed даёт одинаковые данные',
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько дней до запуска разбросаны даты постов',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько строк писать за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        generator = DataGenerator(
+            seed=options['seed'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            log=self.stdout.write,
+        )
+        generator.generate(**{name: options[name] for name in VOLUMES})
+        self.stdout.write(self.style.SUCCESS('Данные для замеров готовы'))
@@ -0,0 +1,170 @@
+"""Микрозамеры отрисовки шаблонов на синтетических контекстах.
+
+Каждый шаблон отрисовывается тысячи раз без базы: посты, авторы и
+группы — несохранённые объекты нужного числа и длины текста. Шаблоны
+берутся через кешированный загрузчик, как в бою, а фрагментный кеш
+выключен нулевым таймаутом, чтобы каждая итерация рисовала ленту.
+
+Стоимость считается в микросекундах на отрисовку и, для сравнения
+между машинами, в долях эталонной отрисовки {{ value }} из того же
+прогона. Выделения памяти — пик tracemalloc за одну отрисовку.
+Сравнение с сохранённой базовой линией помечает шаблоны, которые
+стали дороже в threshold раз и больше.
+"""
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from django.contrib.auth import get_user_model
+from django.template import Engine, RequestContext, engines
+from django.test import RequestFactory
+
+from posts.models import Group, Post, Profile
+from posts.utils import PAGINATION, CachedCountPaginator
+
+User = get_user_model()
+
+ITERATIONS: int = 2000
+ALLOC_ITERATIONS: int = 50
+THRESHOLD: float = 1.5
+TEXT_LENGTH: int = 300
+PAGES: int = 20
+REFERENCE = '{{ value }}'
+
+
+def bench_engine():
+    """Движок с настройками проекта и кешированным загрузчиком."""
+    engine = engines['django'].engine
+    return Engine(
+        dirs=engine.dirs,
+        context_processors=engine.context_processors,
+        loaders=[(
+            'django.template.loaders.cached.Loader', [
+                'django.template.loaders.filesystem.Loader',
+                'django.template.loaders.app_directories.Loader',
+            ],
+        )],
+        libraries=engine.libraries,
+        string_if_invalid=engine.string_if_invalid,
+    )
+
+
+def synthetic_page(size, text_length):
+    """Средняя страница ленты из size несохранённых постов."""
+    author = User(pk=1, username='author', first_name='Лев',
+                  last_name='Толстой')
+    author.profile = Profile(user=author, posts_count=size * PAGES)
+    group = Group(pk=1, title='Группа', slug='group', description='Про всё')
+    text = ('Текст поста ' * text_length)[:text_length]
+    pub_date = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    posts = [
+        Post(pk=number, text=text, author=author, group=group,
+             pub_date=pub_date, comments_count=number)
+        for number in range(1, size * PAGES + 1)
+    ]
+    paginator = CachedCountPaginator(posts, size)
+    return paginator.page(PAGES // 2), author, group
+
+
+def cases(size=PAGINATION, text_length=TEXT_LENGTH):
+    """Имя случая -> (шаблон, контекст)."""
+    page_obj, author, group = synthetic_page(size, text_length)
+    feed = {
+        'page_obj': page_obj,
+        'feed_cache_timeout': 0,
+        'feed_cache_key': 'benchmark',
+    }
+    return {
+        'post_card': ('includes/post_card.html', {'post': page_obj[0]}),
+        'paginator': ('posts/includes/paginator.html', {
+            'page_obj': page_obj,
+        }),
+        'header': ('includes/header.html', {}),
+        'index': ('posts/index.html', {**feed, 'index': True}),
+        'profile': ('posts/profile.html', {
+            **feed, 'author': author, 'username': author.username,
+        }),
+        'group_list': ('posts/group_list.html', {**feed, 'group': group}),
+    }
+
+
+def viewer_request():
+    request = RequestFactory().get('/')
+    request.user = User(pk=2, username='reader')
+    return request
+
+
+def render_cost(template, request, context, iterations):
+    """Среднее время одной отрисовки в микросекундах."""
+    template.render(RequestContext(request, context))
+    start = time.perf_counter()
+    for _ in range(iterations):
+        template.render(RequestContext(request, context))
+    return (time.perf_counter() - start) / iterations * 10 ** 6
+
+
+def render_peak(template, request, context, iterations):
+    """Средний пик выделенной памяти за одну отрисовку в КиБ."""
+    peaks = []
+    for _ in range(iterations):
+        # Свой start/stop на каждую отрисовку: reset_peak есть только
+        # начиная с Python 3.9.
+        tracemalloc.start()
+        try:
+            template.render(RequestContext(request, context))
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+    return sum(peaks) / len(peaks) / 1024
+
+
+def run(iterations=ITERATIONS, size=PAGINATION, text_length=TEXT_LENGTH,
+        alloc_iterations=ALLOC_ITERATIONS, names=None):
+    """Замеряет все случаи и возвращает отчёт."""
+    engine = bench_engine()
+    request = viewer_request()
+    reference = render_cost(
+        engine.from_string(REFERENCE), request, {'value': 'x'}, iterations
+    )
+    results = {}
+    for name, (template_name, context) in cases(size, text_length).items():
+        if names and name not in names:
+            continue
+        template = engine.get_template(template_name)
+        cost = render_cost(template, request, context, iterations)
+        results[name] = {
+            'template': template_name,
+            'us': round(cost, 1),
+            'relative': round(cost / reference, 2),
+            'alloc_kib': round(render_peak(
+                template, request, context, alloc_iterations
+            ), 1),
+        }
+    return {
+        'iterations': iterations,
+        'size': size,
+        'text_length': text_length,
+        'reference_us': round(reference, 2),
+        'results': results,
+    }
+
+
+def regressions(baseline, report, threshold=THRESHOLD):
+    """Шаблоны, которые подорожали в threshold раз и больше.
+
+    Сравниваются относительная стоимость и память; результат — словарь
+    имя -> {метрика: (было, стало)}.
+    """
+    flagged = {}
+    for name, result in report['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before:
+            continue
+        grown = {
+            metric: (before[metric], result[metric])
+            for metric in ('relative', 'alloc_kib')
+            if before[metric] and result[metric] >= before[metric] * threshold
+        }
+        if grown:
+            flagged[name] = grown
+    return flagged
@@ -0,0 +1,264 @@
+"""Прогон всех страниц posts.urls с фиксированной конкурентностью.
+
+Каждая страница запрашивается requests раз в concurrency потоков:
+через тестовый клиент Django в этом же процессе или по HTTP, если
+задан base_url запущенного локального сервера. Число запросов к базе
+берётся из заголовка Server-Timing (core.middleware), поэтому оно
+одинаково доступно в обоих режимах. Страницы только для сотрудников
+(STAFF_URLS) запрашиваются от имени сотрудника, а если в базе его
+нет, пропускаются.
+
+Отчёт — словарь, пригодный для json.dump: коммит, объёмы данных,
+параметры прогона и по каждому имени URL перцентили задержки в
+миллисекундах, пропускная способность, среднее число запросов к базе
+и полученные коды ответа.
+"""
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import requests
+from django.conf import settings
+from django.contrib.auth import (
+    BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model,
+)
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, Profile
+from posts.urls import urlpatterns
+
+User = get_user_model()
+
+DB_QUERIES = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+PERCENTILES = (50, 95, 99)
+STAFF_URLS = ('export',)
+
+
+def percentile(values, share):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    rank = max(int(round(share / 100 * len(values))) - 1, 0)
+    return values[min(rank, len(values) - 1)]
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset():
+    return {
+        model._meta.model_name: model.objects.count()
+        for model in (User, Group, Post, Comment, Follow)
+    }
+
+
+def pick_viewer():
+    """Читатель с наибольшим числом подписок: самая тяжёлая лента."""
+    profile = Profile.objects.select_related('user').order_by(
+        '-following_count', 'pk'
+    ).first()
+    return profile.user if profile else User.objects.order_by('pk').first()
+
+
+def pick_staff():
+    return User.objects.filter(
+        is_staff=True, is_active=True
+    ).order_by('pk').first()
+
+
+def page_urls(viewer):
+    """Адрес для каждого имени из posts.urls на данных из базы.
+
+    Для подписки берётся автор, на которого читатель уже подписан, а
+    для отписки — на которого нет: так прогон не меняет данные.
+    """
+    post = Post.objects.order_by('-comments_count', 'pk').first()
+    author = post.author
+    group = Group.objects.annotate(total=Count('posts')).order_by(
+        '-total', 'pk'
+    ).first()
+    follows = Follow.objects.filter(user=viewer)
+    followed = follows.select_related('author').order_by('pk').first()
+    stranger = User.objects.exclude(
+        pk__in=follows.values_list('author_id')
+    ).exclude(pk=viewer.pk).order_by('pk').first()
+    own_post = viewer.posts.order_by('pk').first() or post
+    kwargs = {
+        'group_list': {'slug': group.slug},
+        'profile': {'username': author.username},
+        'post_detail': {'post_id': post.pk},
+        'post_edit': {'post_id': own_post.pk},
+        'post_comments': {'post_id': post.pk},
+        'add_comment': {'post_id': post.pk},
+        'profile_follow': {
+            'username': (followed.author if followed else viewer).username
+        },
+        'profile_unfollow': {'username': (stranger or viewer).username},
+        'export': {'kind': 'post'},
+        'group_rss': {'slug': group.slug},
+        'group_atom': {'slug': group.slug},
+        'profile_rss': {'username': author.username},
+        'profile_atom': {'username': author.username},
+    }
+    urls = {}
+    for pattern in urlpatterns:
+        name = pattern.name
+        url = reverse(f'posts:{name}', kwargs=kwargs.get(name))
+        if name == 'search':
+            url += '?q=' + post.text.split()[0]
+        urls[name] = url
+    return urls
+
+
+class TestClientSession:
+    """Запросы через тестовый клиент Django в этом процессе."""
+
+    def __init__(self, user):
+        self.client = Client()
+        self.client.force_login(user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code, response.get('Server-Timing', '')
+
+
+class HttpSession:
+    """Запросы по HTTP к запущенному серверу от имени пользователя."""
+
+    def __init__(self, user, base_url):
+        store = SessionStore()
+        store[SESSION_KEY] = str(user.pk)
+        store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        store.create()
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.session.cookies[settings.SESSION_COOKIE_NAME] = (
+            store.session_key
+        )
+
+    def get(self, url):
+        response = self.session.get(self.base_url + url,
+                                    allow_redirects=False)
+        return (
+            response.status_code, response.headers.get('Server-Timing', '')
+        )
+
+
+def measure(sessions, url, count):
+    """Делает count запросов к url, поровну из каждой сессии."""
+    def worker(session, share):
+        timings = []
+        for _ in range(share):
+            start = time.perf_counter()
+            status, header = session.get(url)
+            timings.append((time.perf_counter() - start, status, header))
+        return timings
+
+    def threaded(session, share):
+        try:
+            return worker(session, share)
+        finally:
+            connection.close()
+
+    shares = [
+        count // len(sessions) + (number < count % len(sessions))
+        for number in range(len(sessions))
+    ]
+    started = time.perf_counter()
+    if len(sessions) == 1:
+        results = [worker(sessions[0], shares[0])]
+    else:
+        with ThreadPoolExecutor(len(sessions)) as pool:
+            results = list(pool.map(threaded, sessions, shares))
+    elapsed = time.perf_counter() - started
+    return [timing for result in results for timing in result], elapsed
+
+
+def summarize(timings, elapsed):
+    latencies = sorted(duration * 1000 for duration, _, _ in timings)
+    queries = [
+        int(match.group(1)) for match in (
+            DB_QUERIES.search(header) for _, _, header in timings
+        ) if match
+    ]
+    summary = {
+        f'p{share}_ms': round(percentile(latencies, share), 2)
+        for share in PERCENTILES
+    }
+    summary.update(
+        requests=len(latencies),
+        mean_ms=round(sum(latencies) / len(latencies), 2),
+        rps=round(len(latencies) / elapsed, 1),
+        queries=round(sum(queries) / len(queries), 1) if queries else None,
+        statuses=sorted({status for _, status, _ in timings}),
+    )
+    return summary
+
+
+def run(requests_per_url=100, concurrency=4, warmup=5, base_url=None,
+        names=None, viewer=None):
+    """Прогоняет страницы и возвращает отчёт."""
+    viewer = viewer or pick_viewer()
+    staff = pick_staff()
+    urls = page_urls(viewer)
+    if staff is None:
+        for name in STAFF_URLS:
+            urls.pop(name)
+    if names:
+        urls = {name: urls[name] for name in names}
+
+    def session(user):
+        if base_url:
+            return HttpSession(user, base_url)
+        return TestClientSession(user)
+
+    sessions = [session(viewer) for _ in range(concurrency)]
+    staff_sessions = None
+    results = {}
+    for name, url in urls.items():
+        url_sessions = sessions
+        if name in STAFF_URLS:
+            staff_sessions = staff_sessions or [
+                session(staff) for _ in range(concurrency)
+            ]
+            url_sessions = staff_sessions
+        measure(url_sessions[:1], url, warmup)
+        results[name] = {
+            'url': url,
+            **summarize(*measure(url_sessions, url, requests_per_url)),
+        }
+    return {
+        'commit': current_commit(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'mode': 'http' if base_url else 'client',
+        'concurrency': concurrency,
+        'requests_per_url': requests_per_url,
+        'viewer': viewer.username,
+        'staff': staff.username if staff else None,
+        'dataset': dataset(),
+        'results': results,
+    }
+
+
+def compare(baseline, report, metric='p95_ms'):
+    """Относительное изменение metric по каждому имени URL (0.1 = +10%)."""
+    changes = {}
+    for name, result in report['results'].items():
+        before = baseline.get('results', {}).get(name, {}).get(metric)
+        if before:
+            changes[name] = round(result[metric] / before - 1, 3)
+    return changes
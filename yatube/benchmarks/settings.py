@@ -0,0 +1,22 @@
+"""Настройки для замеров: отдельная база и боевой режим без DEBUG.
+
+    python manage.py seed_benchmark --settings=benchmarks.settings
+    python manage.py run_benchmark --settings=benchmarks.settings
+"""
+from yatube.settings import *  # noqa: F401,F403
+from yatube.settings import BASE_DIR, INSTALLED_APPS, os
+
+DEBUG = False
+
+INSTALLED_APPS = [*INSTALLED_APPS, 'benchmarks.apps.BenchmarksConfig']
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, 'benchmark.sqlite3'),
+    }
+}
+
+POSTS_THUMBNAIL_KVSTORE_PATH = os.path.join(
+    BASE_DIR, 'benchmark-thumbnails.sqlite3'
+)
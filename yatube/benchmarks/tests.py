@@ -0,0 +1,135 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from posts.models import (
+    Comment, Follow, Group, Post, Profile, TimelineEntry,
+)
+from posts.urls import urlpatterns
+
+from . import rendering
+from .data import DataGenerator
+from .runner import PERCENTILES, STAFF_URLS, compare, run
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+VOLUMES = {
+    'users': 20, 'groups': 3, 'posts': 60, 'comments': 100, 'follows': 3,
+}
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POSTS_THUMBNAIL_WORKERS=0,
+    POSTS_THUMBNAIL_KVSTORE_PATH=os.path.join(
+        TEMP_MEDIA_ROOT, 'thumbnails.sqlite3'
+    ),
+)
+class BenchmarkTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def generate(self, seed=0):
+        DataGenerator(seed=seed, batch_size=25).generate(**VOLUMES)
+
+    def snapshot(self):
+        return (
+            list(User.objects.order_by('pk').values_list('first_name')),
+            list(Post.objects.order_by('pk').values_list('text')),
+        )
+
+    def test_generator_creates_consistent_data(self):
+        """Генератор создаёт заданные объёмы и пересобирает производное"""
+        self.generate()
+        self.assertEqual(User.objects.count(), VOLUMES['users'])
+        self.assertEqual(Group.objects.count(), VOLUMES['groups'])
+        self.assertEqual(Post.objects.count(), VOLUMES['posts'])
+        self.assertEqual(Comment.objects.count(), VOLUMES['comments'])
+        self.assertEqual(Profile.objects.count(), VOLUMES['users'])
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(
+                user=follow.user, author=follow.author
+            ).count(),
+            follow.author.posts.count(),
+        )
+
+    def test_generator_is_reproducible(self):
+        """Один seed даёт те же данные"""
+        self.generate()
+        first = self.snapshot()
+        User.objects.all().delete()
+        self.generate()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_runner_reports_every_url(self):
+        """Отчёт содержит перцентили и число запросов для всех страниц"""
+        self.generate()
+        User.objects.create_user(username='staff', is_staff=True)
+        report = run(requests_per_url=3, concurrency=1, warmup=1)
+        self.assertEqual(
+            set(report['results']),
+            {pattern.name for pattern in urlpatterns},
+        )
+        result = report['results']['index']
+        for share in PERCENTILES:
+            self.assertIn(f'p{share}_ms', result)
+        self.assertGreater(result['queries'], 0)
+        self.assertEqual(report['dataset']['post'], VOLUMES['posts'])
+        self.assertEqual(compare(report, report)['index'], 0)
+        self.assertEqual(report['results']['export']['statuses'], [200])
+
+    def test_runner_skips_staff_urls_without_staff(self):
+        """Без сотрудника в базе страницы для сотрудников не замеряются"""
+        self.generate()
+        report = run(requests_per_url=1, concurrency=1, warmup=0)
+        self.assertIsNone(report['staff'])
+        for name in STAFF_URLS:
+            self.assertNotIn(name, report['results'])
+
+
+class TemplateBenchmarkTest(SimpleTestCase):
+    def test_every_case_renders_without_database(self):
+        """Все шаблоны отрисовываются на синтетике без запросов к базе"""
+        report = rendering.run(iterations=2, alloc_iterations=1, size=3)
+        self.assertEqual(set(report['results']), set(rendering.cases()))
+        for name, result in report['results'].items():
+            with self.subTest(name=name):
+                self.assertGreater(result['us'], 0)
+                self.assertGreater(result['alloc_kib'], 0)
+
+    def test_baseline_covers_every_case(self):
+        """В сохранённой базовой линии есть все случаи"""
+        path = os.path.join(
+            os.path.dirname(rendering.__file__), 'template_baseline.json'
+        )
+        with open(path) as baseline:
+            results = json.load(baseline)['results']
+        self.assertEqual(set(results), set(rendering.cases()))
+
+    def test_doubled_cost_is_flagged(self):
+        """Вдвое подорожавший шаблон помечается, шум — нет"""
+        baseline = {'results': {
+            'index': {'relative': 100, 'alloc_kib': 70},
+            'header': {'relative': 10, 'alloc_kib': 10},
+        }}
+        report = {'results': {
+            'index': {'relative': 200, 'alloc_kib': 75},
+            'header': {'relative': 12, 'alloc_kib': 10},
+            'paginator': {'relative': 10, 'alloc_kib': 10},
+        }}
+        self.assertEqual(
+            rendering.regressions(baseline, report),
+            {'index': {'relative': (100, 200)}},
+        )
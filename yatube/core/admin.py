@@ -0,0 +1,39 @@
+from django.contrib.admin.utils import get_fields_from_path
+from django.db.models import Q
+
+PREFIX_END = '\U0010ffff'
+
+
+class PrefixSearchMixin:
+    """Поиск в админке по префиксу через диапазон по индексу.
+
+    Вместо LIKE '%term%' по полям из prefix_search_fields строится
+    условие field >= term AND field < term + PREFIX_END, которое
+    обслуживается обычным индексом. Регистр при этом учитывается.
+    Поле связанной модели (author__username) ищется подзапросом по её
+    индексу, а строки отбираются по индексу внешнего ключа.
+    """
+    prefix_search_fields = ()
+
+    @staticmethod
+    def prefix(name, term):
+        return {f'{name}__gte': term, f'{name}__lt': term + PREFIX_END}
+
+    def get_search_results(self, request, queryset, search_term):
+        term = search_term.strip()
+        if not term or not self.prefix_search_fields:
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        condition = Q()
+        for path in self.prefix_search_fields:
+            if '__' not in path:
+                condition |= Q(**self.prefix(path, term))
+                continue
+            relation = path.rsplit('__', 1)[0]
+            field = get_fields_from_path(self.model, path)[-1]
+            related = field.model._default_manager.filter(
+                **self.prefix(field.name, term)
+            )
+            condition |= Q(**{f'{relation}__in': related.values('pk')})
+        return queryset.filter(condition), False
@@ -0,0 +1,62 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.memcached import MemcachedCache
+
+from .timing import timed
+
+MISSING = object()
+
+
+class TimedCacheMixin:
+    """Учитывает время обращений к кешу, попадания и промахи в запросе.
+
+    Подмешивается перед классом любого бэкенда кеша Django.
+    """
+
+    def get(self, key, default=None, version=None):
+        with timed('cache') as timings:
+            value = super().get(key, MISSING, version)
+            if timings is not None:
+                outcome = 'cache_misses' if value is MISSING else 'cache_hits'
+                timings.counts[outcome] += 1
+        return default if value is MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        with timed('cache') as timings:
+            values = super().get_many(keys, version)
+            if timings is not None:
+                timings.counts['cache_hits'] += len(values)
+                timings.counts['cache_misses'] += len(keys) - len(values)
+        return values
+
+    def set(self, *args, **kwargs):
+        with timed('cache'):
+            return super().set(*args, **kwargs)
+
+    def set_many(self, *args, **kwargs):
+        with timed('cache'):
+            return super().set_many(*args, **kwargs)
+
+    def add(self, *args, **kwargs):
+        with timed('cache'):
+            return super().add(*args, **kwargs)
+
+    def incr(self, *args, **kwargs):
+        with timed('cache'):
+            return super().incr(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with timed('cache'):
+            return super().delete(*args, **kwargs)
+
+    def delete_many(self, *args, **kwargs):
+        with timed('cache'):
+            return super().delete_many(*args, **kwargs)
+
+
+class TimedLocMemCache(TimedCacheMixin, LocMemCache):
+    pass
+
+
+class TimedMemcachedCache(TimedCacheMixin, MemcachedCache):
+    pass
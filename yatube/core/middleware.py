@@ -0,0 +1,81 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import profiling, timing
+from .queries import QueryCounter, budget_for, check_budget
+
+logger = logging.getLogger('core.timing')
+
+
+class ServerTimingMiddleware:
+    """Отдаёт в заголовке Server-Timing и в лог, на что ушло время запроса.
+
+    Стоит первым в MIDDLEWARE, чтобы total покрывал всю обработку.
+    Учитываются запросы к базе (число и время), обращения к кешу
+    (попадания, промахи, время), отрисовка шаблонов и миниатюры.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = timing.start()
+        try:
+            with connection.execute_wrapper(timings):
+                response = self.get_response(request)
+        finally:
+            timing.stop()
+        response['Server-Timing'] = timings.header()
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            **timings.as_dict(),
+        }))
+        return response
+
+
+class ProfilingMiddleware:
+    """Профилирует запросы сотрудников с токеном, см. core.profiling.
+
+    Стоит после AuthenticationMiddleware. Без settings.PROFILING_DIR
+    не подключается вовсе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.PROFILING_DIR:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = profiling.requested_token(request)
+        if token and profiling.check_token(token, request.user):
+            return profiling.profile_request(self.get_response, request)
+        return self.get_response(request)
+
+
+class QueryBudgetMiddleware:
+    """Сверяет число запросов к базе с бюджетом URL в режиме DEBUG.
+
+    Бюджеты берутся из settings.QUERY_BUDGETS по имени URL, которое
+    известно только после резолвинга, поэтому считаются все запросы
+    обработки, а проверяются после ответа.
+    """
+
+    def __init__(self, get_response):
+        if not settings.DEBUG:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryCounter() as counter:
+            response = self.get_response(request)
+        match = getattr(request, 'resolver_match', None)
+        limit = budget_for(match.view_name) if match else None
+        if limit is not None:
+            check_budget(counter, limit, match.view_name)
+        return response
@@ -0,0 +1,123 @@
+"""Профилирование отдельных запросов по подписанному токену.
+
+Сотрудник получает на странице профилей в админке токен и добавляет
+его к адресу (?_profile=<токен>) или в заголовок X-Profile. Такой
+запрос выполняется под cProfile, а в settings.PROFILING_DIR остаются
+три файла с общим именем: <id>.prof (pstats), <id>.sql (все запросы
+к базе со временем) и <id>.json (метод, путь, статус, длительность).
+Хранятся последние settings.PROFILING_KEEP профилей.
+
+Пока PROFILING_DIR не задан, ProfilingMiddleware отключается при
+старте и ничего не стоит.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core import signing
+
+from .queries import QueryCounter
+
+PROFILE_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+PROFILE_ID = re.compile(r'^\d{8}-\d{6}-\d{6}$')
+PROFILE_KINDS = ('prof', 'sql', 'json')
+SALT = 'core.profiling'
+
+
+def make_token(user):
+    """Токен, который включает профилирование запросов этого сотрудника."""
+    return signing.TimestampSigner(salt=SALT).sign(str(user.pk))
+
+
+def requested_token(request):
+    return request.GET.get(PROFILE_PARAM) or request.META.get(PROFILE_HEADER)
+
+
+def check_token(token, user):
+    """Подходит ли токен пользователю: он сотрудник и токен не истёк."""
+    if not user.is_authenticated or not user.is_staff:
+        return False
+    try:
+        user_pk = signing.TimestampSigner(salt=SALT).unsign(
+            token, max_age=settings.PROFILING_TOKEN_MAX_AGE
+        )
+    except signing.BadSignature:
+        return False
+    return user_pk == str(user.pk)
+
+
+def profile_path(profile_id, kind):
+    """Путь к файлу профиля или None для чужого имени."""
+    if not PROFILE_ID.match(profile_id) or kind not in PROFILE_KINDS:
+        return None
+    return os.path.join(settings.PROFILING_DIR, f'{profile_id}.{kind}')
+
+
+def profile_request(get_response, request):
+    """Выполняет запрос под cProfile и сохраняет профиль с SQL."""
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    with QueryCounter() as queries:
+        response = profiler.runcall(get_response, request)
+    duration = time.perf_counter() - start
+    profile_id = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    profiler.dump_stats(profile_path(profile_id, 'prof'))
+    with open(profile_path(profile_id, 'sql'), 'w') as sql_file:
+        for query in queries.queries:
+            sql_file.write(
+                f"-- {float(query['time']) * 1000:.1f} ms, "
+                f"params: {query['params']!r}\n{query['sql']};\n\n"
+            )
+    with open(profile_path(profile_id, 'json'), 'w') as meta_file:
+        json.dump({
+            'id': profile_id,
+            'method': request.method,
+            'path': request.path,
+            'user': request.user.get_username(),
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'queries': len(queries),
+        }, meta_file, ensure_ascii=False)
+    prune_profiles()
+    response['X-Profile-Id'] = profile_id
+    return response
+
+
+def list_profiles():
+    """Описания сохранённых профилей от новых к старым."""
+    directory = settings.PROFILING_DIR
+    if not directory or not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        profile_id, _, kind = name.rpartition('.')
+        if kind != 'json' or not PROFILE_ID.match(profile_id):
+            continue
+        with open(os.path.join(directory, name)) as meta_file:
+            profiles.append(json.load(meta_file))
+    return profiles
+
+
+def prune_profiles():
+    """Удаляет профили старше последних PROFILING_KEEP."""
+    for meta in list_profiles()[settings.PROFILING_KEEP:]:
+        for kind in PROFILE_KINDS:
+            path = profile_path(meta['id'], kind)
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def profile_summary(profile_id, limit=50):
+    """Текстовая сводка pstats: самые дорогие функции по общему времени."""
+    stream = io.StringIO()
+    stats = pstats.Stats(profile_path(profile_id, 'prof'), stream=stream)
+    stats.sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
@@ -0,0 +1,112 @@
+"""Бюджеты SQL-запросов для представлений.
+
+Бюджет — наибольшее число запросов к базе, которое можно сделать за
+один запрос к сайту. Он задаётся прямо в коде через query_budget или
+по имени URL в settings.QUERY_BUDGETS для QueryBudgetMiddleware.
+Превышение пишется в лог или, при QUERY_BUDGET_ACTION = 'raise',
+поднимает QueryBudgetExceeded, чтобы N+1 ронял тесты.
+"""
+import logging
+import time
+from contextlib import ContextDecorator
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Код сделал больше запросов к базе, чем разрешает бюджет."""
+
+
+class QueryCounter:
+    """Собирает SQL и время всех запросов к базе внутри блока with.
+
+    Записи в queries — словари с ключами sql, params и time (секунды
+    строкой, как в CaptureQueriesContext).
+    """
+
+    def __init__(self, using=DEFAULT_DB_ALIAS):
+        self.using = using
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append({
+                'sql': sql,
+                'params': params,
+                'time': f'{time.perf_counter() - start:.3f}',
+            })
+
+    def __enter__(self):
+        self._wrapper = connections[self.using].execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    def __len__(self):
+        return len(self.queries)
+
+
+def budget_for(view_name):
+    """Бюджет из settings.QUERY_BUDGETS для имени URL вида 'posts:index'."""
+    return settings.QUERY_BUDGETS.get(view_name)
+
+
+def check_budget(counter, limit, label, action=None):
+    """Сообщает о превышении бюджета так, как велит QUERY_BUDGET_ACTION."""
+    if len(counter) <= limit:
+        return
+    message = '\n'.join([
+        f'{label}: {len(counter)} запросов к базе при бюджете {limit}',
+        *(query['sql'] for query in counter.queries),
+    ])
+    if (action or settings.QUERY_BUDGET_ACTION) == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class query_budget(ContextDecorator):
+    """Ограничивает число запросов к базе в блоке with или в функции.
+
+        with query_budget(5, 'лента'):
+            ...
+
+        @query_budget(5)
+        def index(request):
+            ...
+    """
+
+    def __init__(self, limit, label=None, action=None,
+                 using=DEFAULT_DB_ALIAS):
+        self.limit = limit
+        self.label = label
+        self.action = action
+        self.using = using
+
+    def __call__(self, func):
+        if self.label is None:
+            self.label = f'{func.__module__}.{func.__qualname__}'
+        return super().__call__(func)
+
+    def _recreate_cm(self):
+        # У каждого вызова функции свой счётчик, даже в разных потоках.
+        return type(self)(self.limit, self.label, self.action, self.using)
+
+    def __enter__(self):
+        self.counter = QueryCounter(self.using).__enter__()
+        return self.counter
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.counter.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None:
+            check_budget(
+                self.counter, self.limit, self.label or 'query_budget',
+                self.action,
+            )
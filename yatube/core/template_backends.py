@@ -0,0 +1,24 @@
+from django.template.backends.django import DjangoTemplates, Template
+
+from .timing import timed
+
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        with timed('render'):
+            return super().render(context, request)
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Шаблоны Django, время отрисовки которых идёт в Server-Timing.
+
+    Оборачиваются только шаблоны верхнего уровня; include и extends
+    отрисовываются внутри них и попадают в то же время.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
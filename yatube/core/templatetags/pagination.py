@@ -0,0 +1,18 @@
+from django import template
+
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page_obj):
+    return page_obj.paginator.page_window(page_obj.number)
+
+
+@register.simple_tag(takes_context=True)
+def page_url(context, **params):
+    """Ссылка на другую страницу с сохранением остальных GET-параметров."""
+    query = context['request'].GET.copy()
+    for name, value in params.items():
+        query[name] = value
+    return f'?{query.urlencode()}'
@@ -0,0 +1,105 @@
+"""Время обработки запроса по частям: база, кеш, шаблоны, миниатюры.
+
+ServerTimingMiddleware заводит на запрос объект RequestTimings в
+локальном хранилище потока; код, который хочет попасть в отчёт,
+оборачивается в timed(name). Вне запроса и в фоновых потоках timed
+ничего не делает, а вложенные блоки с тем же именем не считаются
+дважды, поэтому учёт стоит лишь пары вызовов perf_counter.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """Суммарные длительности (в секундах) и счётчики одного запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.total = None
+        self.durations = defaultdict(float)
+        self.counts = Counter()
+        self.active = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        """Обёртка execute_wrapper: время и число запросов к базе."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.durations['db'] += time.perf_counter() - start
+            self.counts['db'] += 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def header(self):
+        """Значение заголовка Server-Timing, длительности в миллисекундах."""
+        ms = {name: value * 1000 for name, value in self.durations.items()}
+        metrics = [
+            f'db;dur={ms.get("db", 0):.1f};'
+            f'desc="{self.counts["db"]} queries"',
+            f'cache;dur={ms.get("cache", 0):.1f};'
+            f'desc="{self.counts["cache_hits"]} hits / '
+            f'{self.counts["cache_misses"]} misses"',
+            f'render;dur={ms.get("render", 0):.1f}',
+            f'thumb;dur={ms.get("thumb", 0):.1f}',
+        ]
+        if self.total is not None:
+            metrics.append(f'total;dur={self.total * 1000:.1f}')
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        """Плоский словарь для структурированной строки лога."""
+        data = {
+            f'{name}_ms': round(self.durations[name] * 1000, 1)
+            for name in ('db', 'cache', 'render', 'thumb')
+        }
+        data.update(
+            db_queries=self.counts['db'],
+            cache_hits=self.counts['cache_hits'],
+            cache_misses=self.counts['cache_misses'],
+        )
+        if self.total is not None:
+            data['total_ms'] = round(self.total * 1000, 1)
+        return data
+
+
+def start():
+    _local.timings = RequestTimings()
+    return _local.timings
+
+
+def stop():
+    timings = current()
+    _local.timings = None
+    if timings is not None:
+        timings.finish()
+    return timings
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def timed(name):
+    """Добавляет время блока к метрике name текущего запроса.
+
+    Отдаёт RequestTimings, если блок учитывается, иначе None.
+    Работает и как декоратор.
+    """
+    timings = current()
+    if timings is None or name in timings.active:
+        yield None
+        return
+    timings.active.add(name)
+    start_time = time.perf_counter()
+    try:
+        yield timings
+    finally:
+        timings.durations[name] += time.perf_counter() - start_time
+        timings.active.discard(name)
@@ -1,7 +1,13 @@
+import os
 from http import HTTPStatus
 
+from django.conf import settings
+from django.contrib import admin
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
 
+from . import profiling
+
 
 def page_not_found(request, exception):
     return render(
@@ -22,3 +28,39 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+@admin.site.admin_view
+def profile_list(request):
+    """Страница админки со списком последних профилей запросов."""
+    context = {
+        **admin.site.each_context(request),
+        'title': 'Профили запросов',
+        'enabled': bool(settings.PROFILING_DIR),
+        'profiles': profiling.list_profiles(),
+        'param': profiling.PROFILE_PARAM,
+        'token': profiling.make_token(request.user),
+        'kinds': ('txt', 'prof', 'sql'),
+    }
+    return render(request, 'core/profiles.html', context)
+
+
+@admin.site.admin_view
+def profile_download(request, profile_id, kind):
+    """Файл профиля; txt — текстовая сводка pstats по файлу prof."""
+    if not settings.PROFILING_DIR:
+        raise Http404
+    source = profiling.profile_path(
+        profile_id, 'prof' if kind == 'txt' else kind
+    )
+    if source is None or not os.path.exists(source):
+        raise Http404
+    if kind == 'txt':
+        return HttpResponse(
+            profiling.profile_summary(profile_id),
+            content_type='text/plain; charset=utf-8'
+        )
+    return FileResponse(
+        open(source, 'rb'), as_attachment=True,
+        filename=os.path.basename(source)
+    )
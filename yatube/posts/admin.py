@@ -1,6 +1,10 @@
 from django.contrib import admin
 
+from core.admin import PrefixSearchMixin
+
 from .models import Post, Group, Comment, Follow
+from .search import filter_matching
+from .utils import EstimatedCountPaginator
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -12,12 +16,70 @@ class PostAdmin(admin.ModelAdmin):
         'group',
     )
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        """Варианты групп строятся один раз на запрос, а не на строку."""
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group' and request is not None:
+            choices = getattr(request, '_post_group_choices', None)
+            if choices is None:
+                choices = request._post_group_choices = list(
+                    iter(formfield.choices)
+                )
+            formfield.choices = choices
+        return formfield
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по полнотекстовому индексу вместо LIKE по всей таблице."""
+        if search_term:
+            matching = filter_matching(queryset, search_term)
+            if matching is not None:
+                return matching, False
+        return super().get_search_results(request, queryset, search_term)
+
+
+class CommentAdmin(PrefixSearchMixin, admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'text',
+        'author',
+        'post',
+        'created',
+    )
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author', 'post')
+    search_fields = ('author__username',)
+    prefix_search_fields = ('author__username',)
+    date_hierarchy = 'created'
+    empty_value_display = '-пусто-'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class FollowAdmin(PrefixSearchMixin, admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'user',
+        'author',
+    )
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
+    search_fields = ('user__username', 'author__username')
+    prefix_search_fields = ('user__username', 'author__username')
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
-admin.site.register(Comment)
-admin.site.register(Follow)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,125 @@
+"""Условные GET-запросы (ETag / Last-Modified) для лент и постов.
+
+Валидаторы строятся из поколений лент (см. posts.utils.get_feed_state),
+поэтому повторный запрос без изменений отдаёт 304 без обращения к
+шаблонам и почти без запросов к базе. Страницы содержат имя текущего
+пользователя и формы с его CSRF-токеном, так что ETag зависит от
+пользователя и секрета CSRF (он меняется при каждом входе), а ответ
+помечается Vary: Cookie. Ответы, одинаковые для всех (RSS и Atom), обслуживает
+cached_feed: их ETag общий, а тело кешируется по нему целиком.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import (
+    get_conditional_response, patch_vary_headers, quote_etag
+)
+from django.utils.http import http_date
+
+from .utils import FEED_CACHE_TIMEOUT, get_feed_state
+
+
+def feed_etag(request, versions, personal=True):
+    """ETag ответа по поколениям лент и, для личных страниц, читателю."""
+    user = ''
+    if personal and request.user.is_authenticated:
+        user = (request.user.pk, request.META.get('CSRF_COOKIE'))
+    # Ленты RSS и Atom содержат абсолютные ссылки на хост запроса.
+    raw = repr((
+        sorted(versions.items()), user, request.scheme, request.get_host(),
+        request.get_full_path(),
+    ))
+    return quote_etag(hashlib.md5(raw.encode()).hexdigest())
+
+
+def set_validators(response, etag, last_modified):
+    response.setdefault('ETag', etag)
+    if last_modified is not None:
+        response.setdefault('Last-Modified', http_date(last_modified))
+
+
+def conditional_feed(feeds_for):
+    """Декоратор вида: feeds_for(request, *args, **kwargs) -> ленты.
+
+    Если feeds_for вернул None (например, группы нет), вид отрабатывает
+    как обычно без валидаторов. Авторизованным читателям Last-Modified
+    не отдаётся: он общий для всех, и по одному If-Modified-Since
+    вошедший пользователь получил бы 304 на страницу гостя.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            feeds = feeds_for(request, *args, **kwargs)
+            if feeds is None:
+                return view(request, *args, **kwargs)
+            versions, changed = get_feed_state(*feeds)
+            last_modified = (
+                None if request.user.is_authenticated else int(changed)
+            )
+            response = get_conditional_response(
+                request,
+                etag=feed_etag(request, versions),
+                last_modified=last_modified,
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code == 200:
+                    # Вид мог выдать новый секрет CSRF для формы.
+                    set_validators(
+                        response, feed_etag(request, versions),
+                        last_modified
+                    )
+            patch_vary_headers(response, ('Cookie',))
+            return response
+        return inner
+    return decorator
+
+
+def cached_feed(feeds_for, timeout=FEED_CACHE_TIMEOUT):
+    """Условный GET и кеш тела для ответов, общих для всех читателей.
+
+    Тело хранится под ключом из ETag, то есть из поколений лент: запись
+    в ленту сдвигает поколение, и следующий запрос собирает ответ
+    заново, а старый ключ просто истекает.
+    """
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            feeds = feeds_for(request, *args, **kwargs)
+            if feeds is None:
+                return view(request, *args, **kwargs)
+            versions, changed = get_feed_state(*feeds)
+            etag = feed_etag(request, versions, personal=False)
+            last_modified = int(changed)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is not None:
+                return response
+            key = f'posts:response:{etag}'
+            cached = cache.get(key)
+            if cached is not None:
+                content, headers = cached
+                response = HttpResponse(content)
+                for header, value in headers.items():
+                    response[header] = value
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                headers = {
+                    header: response[header]
+                    for header in ('Content-Type', 'Last-Modified')
+                    if response.has_header(header)
+                }
+                cache.set(key, (response.content, headers), timeout)
+            set_validators(response, etag, last_modified)
+            return response
+        return inner
+    return decorator
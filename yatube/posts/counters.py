@@ -0,0 +1,97 @@
+"""Денормализованные счётчики постов, комментариев и подписок.
+
+Счётчики меняются атомарно через F()-выражения в сигналах
+posts.signals, а команда reconcile_counters исправляет накопившийся
+дрейф пачками по диапазонам первичных ключей.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, Profile
+
+User = get_user_model()
+
+BATCH_SIZE: int = 1000
+
+
+def bump(queryset, field, delta=1):
+    """Атомарно сдвигает счётчик field на delta, не уходя ниже нуля."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def bump_profile(user_id, field, delta=1):
+    bump(Profile.objects.filter(user_id=user_id), field, delta)
+
+
+def bump_post(post_id, delta=1):
+    if post_id is not None:
+        bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def count_of(model, field, outer='pk'):
+    """Подзапрос COUNT(*) строк model, ссылающихся на внешнюю строку."""
+    rows = (
+        model.objects.filter(**{field: OuterRef(outer)})
+        .order_by().values(field).annotate(total=Count('pk'))
+        .values('total')
+    )
+    return Coalesce(Subquery(rows, output_field=IntegerField()), 0)
+
+
+def _fix(queryset, counters):
+    drifted = list(
+        queryset.annotate(**{
+            f'real_{field}': expression
+            for field, expression in counters.items()
+        }).exclude(**{
+            field: F(f'real_{field}') for field in counters
+        })
+    )
+    for obj in drifted:
+        for field in counters:
+            setattr(obj, field, getattr(obj, f'real_{field}'))
+    queryset.model.objects.bulk_update(drifted, list(counters))
+    return len(drifted)
+
+
+def _batches(queryset, batch_size):
+    last_pk = 0
+    while True:
+        pks = list(
+            queryset.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not pks:
+            return
+        yield queryset.filter(pk__gte=pks[0], pk__lte=pks[-1])
+        last_pk = pks[-1]
+
+
+def reconcile_profiles(batch_size=BATCH_SIZE):
+    """Создаёт недостающие профили и чинит их счётчики."""
+    fixed = 0
+    for users in _batches(User.objects.all(), batch_size):
+        Profile.objects.bulk_create(
+            [Profile(user_id=pk) for pk in users.values_list('pk', flat=True)],
+            ignore_conflicts=True,
+        )
+    counters = {
+        'posts_count': count_of(Post, 'author', 'user_id'),
+        'followers_count': count_of(Follow, 'author', 'user_id'),
+        'following_count': count_of(Follow, 'user', 'user_id'),
+    }
+    for profiles in _batches(Profile.objects.all(), batch_size):
+        fixed += _fix(profiles, counters)
+    return fixed
+
+
+def reconcile_posts(batch_size=BATCH_SIZE):
+    """Чинит счётчики комментариев у постов."""
+    counters = {'comments_count': count_of(Comment, 'post')}
+    return sum(
+        _fix(posts, counters)
+        for posts in _batches(Post.objects.all(), batch_size)
+    )
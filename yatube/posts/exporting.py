@@ -0,0 +1,74 @@
+"""Потоковая выгрузка постов и комментариев в JSONL или CSV.
+
+Строки читаются пачками по первичному ключу (WHERE id > последний
+id ORDER BY id LIMIT batch_size) сразу с именем автора и slug группы,
+поэтому память не зависит от размера таблицы, а первая строка уходит
+после первой же пачки. Формат постов совпадает с тем, что принимает
+import_data.
+"""
+import csv
+import json
+
+from .models import Comment, Post
+
+BATCH_SIZE: int = 2000
+FORMATS = ('jsonl', 'csv')
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+EXPORTS = {
+    'post': (Post, {
+        'id': 'pk',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'comments_count': 'comments_count',
+    }),
+    'comment': (Comment, {
+        'id': 'pk',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }),
+}
+
+
+def export_rows(kind, batch_size=BATCH_SIZE):
+    """Словари строк выгрузки kind по возрастанию id."""
+    model, columns = EXPORTS[kind]
+    queryset = model.objects.order_by('pk').values_list(*columns.values())
+    last_pk = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+        for row in rows:
+            record = dict(zip(columns, row))
+            for name, value in record.items():
+                if hasattr(value, 'isoformat'):
+                    record[name] = value.isoformat()
+            yield {'type': kind, **record}
+        if len(rows) < batch_size:
+            return
+        last_pk = rows[-1][0]
+
+
+class Echo:
+    """Файлоподобный объект для csv.writer, который просто отдаёт строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(kind, fmt, batch_size=BATCH_SIZE):
+    """Строки файла выгрузки, готовые к записи или отправке."""
+    rows = export_rows(kind, batch_size)
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+    writer = csv.writer(Echo())
+    yield writer.writerow(['type', *EXPORTS[kind][1]])
+    for row in rows:
+        yield writer.writerow(row.values())
@@ -0,0 +1,128 @@
+"""RSS и Atom для общей ленты, групп и авторов.
+
+Ленты строятся на тех же запросах, что и страницы, и отдаются через
+cached_feed: повторный опрос без новых постов получает 304 или готовое
+тело из кеша без отрисовки и без запросов к базе, кроме поиска группы
+или автора по адресу.
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from .conditional import cached_feed
+from .models import Group, Post
+from .views import group_feeds
+
+User = get_user_model()
+
+FEED_ITEMS: int = 20
+TITLE_WORDS: int = 8
+
+
+def index_feeds(request):
+    return ['index']
+
+
+def author_feeds(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    return None if author_id is None else [f'author:{author_id}']
+
+
+class PostsFeed(Feed):
+    """Последние посты сайта в RSS."""
+    title = 'Последние обновления на сайте Yatube'
+    description = 'Новые посты всех авторов'
+
+    def link(self, obj):
+        return reverse('posts:index')
+
+    def items(self, obj):
+        return Post.objects.select_related('author', 'group')[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return Truncator(item.text).words(TITLE_WORDS)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class GroupPostsFeed(PostsFeed):
+    """Последние посты группы в RSS."""
+
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f'Записи сообщества {obj.title}'
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse('posts:group_list', args=[obj.slug])
+
+    def items(self, obj):
+        return obj.posts.select_related('author', 'group')[:FEED_ITEMS]
+
+
+class AuthorPostsFeed(PostsFeed):
+    """Последние посты автора в RSS."""
+
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f'Посты пользователя {obj.username}'
+
+    def description(self, obj):
+        return f'Новые посты пользователя {obj.username}'
+
+    def link(self, obj):
+        return reverse('posts:profile', args=[obj.username])
+
+    def items(self, obj):
+        return obj.posts.select_related('author', 'group')[:FEED_ITEMS]
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+
+class AtomPostsFeed(AtomMixin, PostsFeed):
+    pass
+
+
+class AtomGroupPostsFeed(AtomMixin, GroupPostsFeed):
+    pass
+
+
+class AtomAuthorPostsFeed(AtomMixin, AuthorPostsFeed):
+    pass
+
+
+index_rss = cached_feed(index_feeds)(PostsFeed())
+index_atom = cached_feed(index_feeds)(AtomPostsFeed())
+group_rss = cached_feed(group_feeds)(GroupPostsFeed())
+group_atom = cached_feed(group_feeds)(AtomGroupPostsFeed())
+profile_rss = cached_feed(author_feeds)(AuthorPostsFeed())
+profile_atom = cached_feed(author_feeds)(AtomAuthorPostsFeed())
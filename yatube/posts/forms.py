@@ -1,6 +1,8 @@
 from django.contrib.auth import get_user_model
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import ingest
 from .models import Post, Comment
 
 User = get_user_model()
@@ -17,6 +19,14 @@ class PostForm(forms.ModelForm):
         }
         labels = {'text': 'Текст', 'group': 'Группа', 'image': 'Картинка'}
 
+    def clean_image(self):
+        """Новая картинка проверяется по заголовку и приводится к мастеру."""
+        image = self.cleaned_data['image']
+        if not isinstance(image, UploadedFile):
+            return image
+        ingest.check_pixels(*image.image.size)
+        return ingest.normalize(image)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
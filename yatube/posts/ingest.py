@@ -0,0 +1,75 @@
+"""Приём картинок постов.
+
+Размер загруженной картинки берётся из заголовка, и слишком большие
+картинки отклоняются ещё до декодирования пикселей. Остальные
+поворачиваются по EXIF, теряют метаданные и уменьшаются до мастера не
+больше POSTS_IMAGE_MAX_SIDE по длинной стороне: миниатюры потом режутся
+из него, а не из исходной фотографии.
+"""
+import io
+import os
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+KEPT_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+}
+SAVE_OPTIONS = {
+    'JPEG': {'quality': 88, 'optimize': True, 'progressive': True},
+    'PNG': {'optimize': True},
+    'GIF': {},
+}
+
+
+def check_pixels(width, height):
+    """Отклоняет картинку, в которой больше POSTS_IMAGE_MAX_PIXELS точек."""
+    if width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: не больше %(limit)s мегапикселей.',
+            code='too_many_pixels',
+            params={
+                'limit': round(settings.POSTS_IMAGE_MAX_PIXELS / 10 ** 6),
+            },
+        )
+
+
+def normalize(upload):
+    """Мастер картинки: по EXIF, без метаданных, не больше предела.
+
+    Анимированные картинки сохраняются как есть, чтобы не потерять
+    кадры. Форматы, кроме JPEG, PNG и GIF, пересохраняются в PNG.
+    """
+    upload.seek(0)
+    image = Image.open(upload)
+    if getattr(image, 'is_animated', False):
+        upload.seek(0)
+        return upload
+    max_side = settings.POSTS_IMAGE_MAX_SIDE
+    source_format = image.format
+    if source_format == 'JPEG':
+        image.draft('RGB', (max_side, max_side))
+    icc_profile = image.info.get('icc_profile')
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    image_format = source_format if source_format in KEPT_FORMATS else 'PNG'
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    # PNG и GIF переносят в файл всё из info, включая EXIF.
+    image.info = {
+        key: value for key, value in image.info.items()
+        if key == 'transparency'
+    }
+    options = dict(SAVE_OPTIONS[image_format])
+    if icc_profile and image_format != 'GIF':
+        options['icc_profile'] = icc_profile
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    name = os.path.splitext(os.path.basename(upload.name))[0]
+    return ContentFile(
+        buffer.getvalue(), name=f'{name}.{KEPT_FORMATS[image_format]}'
+    )
@@ -0,0 +1,139 @@
+"""Хранилища ключей sorl с пакетным чтением.
+
+get_raw_many достаёт сразу все ключи, нужные странице ленты, вместо
+отдельного обращения на каждую миниатюру.
+
+SQLiteKVStore держит ключи в отдельном файле SQLite, общем для всех
+процессов сервера, а перед ним — ограниченный LRU в памяти процесса.
+LRU у каждого процесса свой: удаление в одном процессе другие увидят,
+только когда их запись устареет через POSTS_THUMBNAIL_LRU_TTL секунд.
+Счётчики попаданий и промахов отдаёт posts:thumbnail_metrics.
+"""
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from sorl.thumbnail.kvstores.base import KVStoreBase
+
+SQLITE_VARIABLES = 900
+
+
+class SQLiteKVStore(KVStoreBase):
+    """Ключи sorl в файле POSTS_THUMBNAIL_KVSTORE_PATH с LRU впереди.
+
+    В LRU попадают только найденные значения: миниатюру, которую
+    только что подготовил другой процесс, промах в памяти не спрячет.
+    Запись LRU живёт POSTS_THUMBNAIL_LRU_TTL секунд, после чего ключ
+    снова читается из файла.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self._lru_path = None
+        self.stats = Counter()
+
+    def _connection(self):
+        path = settings.POSTS_THUMBNAIL_KVSTORE_PATH
+        if getattr(self._local, 'path', None) != path:
+            connection = sqlite3.connect(path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS kvstore '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL)'
+            )
+            connection.commit()
+            self._local.connection = connection
+            self._local.path = path
+        with self._lock:
+            if self._lru_path != path:
+                self._lru.clear()
+                self._lru_path = path
+        return self._local.connection
+
+    def _remember(self, values):
+        expires = time.monotonic() + settings.POSTS_THUMBNAIL_LRU_TTL
+        with self._lock:
+            self._lru.update(
+                (key, (value, expires)) for key, value in values.items()
+            )
+            for key in values:
+                self._lru.move_to_end(key)
+            while len(self._lru) > settings.POSTS_THUMBNAIL_LRU_SIZE:
+                self._lru.popitem(last=False)
+
+    def _forget(self, keys):
+        with self._lock:
+            for key in keys:
+                self._lru.pop(key, None)
+
+    def get_raw_many(self, keys):
+        connection = self._connection()
+        values = {}
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                if key not in self._lru:
+                    continue
+                value, expires = self._lru[key]
+                if expires <= now:
+                    del self._lru[key]
+                    continue
+                self._lru.move_to_end(key)
+                values[key] = value
+            missing = [key for key in keys if key not in values]
+            self.stats.update(
+                lookups=1, lru_hits=len(values), lru_misses=len(missing)
+            )
+        found = {}
+        for start in range(0, len(missing), SQLITE_VARIABLES):
+            chunk = missing[start:start + SQLITE_VARIABLES]
+            found.update(connection.execute(
+                'SELECT key, value FROM kvstore WHERE key IN (%s)'
+                % ', '.join('?' * len(chunk)), chunk
+            ))
+        with self._lock:
+            self.stats.update(
+                file_hits=len(found), file_misses=len(missing) - len(found)
+            )
+        self._remember(found)
+        values.update(found)
+        return {key: values.get(key) for key in keys}
+
+    def _get_raw(self, key):
+        return self.get_raw_many([key])[key]
+
+    def _set_raw(self, key, value):
+        connection = self._connection()
+        with connection:
+            connection.execute(
+                'INSERT OR REPLACE INTO kvstore (key, value) VALUES (?, ?)',
+                (key, value)
+            )
+        self._remember({key: value})
+
+    def _delete_raw(self, *keys):
+        connection = self._connection()
+        with connection:
+            connection.executemany(
+                'DELETE FROM kvstore WHERE key = ?', [(key,) for key in keys]
+            )
+        self._forget(keys)
+
+    def _find_keys_raw(self, prefix):
+        rows = self._connection().execute(
+            "SELECT key FROM kvstore WHERE key LIKE ? ESCAPE '\\'",
+            (prefix.replace('\\', '\\\\').replace('%', '\\%')
+             .replace('_', '\\_') + '%',)
+        )
+        return [key for key, in rows]
+
+    def metrics(self):
+        """Счётчики процесса и текущий размер LRU."""
+        with self._lock:
+            size = len(self._lru)
+        return {**self.stats, 'lru_size': size}
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from posts.exporting import BATCH_SIZE, EXPORTS, FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты или комментарии в JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(EXPORTS))
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument(
+            '--output',
+            default='-',
+            help='Файл выгрузки; «-» — стандартный вывод',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько строк читать за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        lines = export_lines(
+            options['kind'], options['format'], options['batch_size']
+        )
+        if options['output'] == '-':
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+        with open(options['output'], 'w', newline='',
+                  encoding='utf-8') as stream:
+            stream.writelines(lines)
@@ -0,0 +1,60 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importing import BATCH_SIZE, FORMATS, KINDS, Importer, read_records
+
+
+class Command(BaseCommand):
+    help = 'Потоково импортирует пользователей, группы, посты и подписки'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл JSONL или CSV; «-» — стандартный ввод',
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Формат файла; по умолчанию по расширению',
+        )
+        parser.add_argument(
+            '--kind',
+            choices=KINDS,
+            help='Тип записей без поля type, например для CSV',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько записей писать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or os.path.splitext(path)[1].lstrip('.')
+        if fmt not in FORMATS:
+            raise CommandError('Укажите --format: jsonl или csv')
+        importer = Importer(options['batch_size'], log=self.stdout.write)
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, newline='', encoding='utf-8')
+        )
+        try:
+            for line, record in read_records(stream, fmt):
+                importer.feed(line, record, options['kind'])
+        except ValueError as error:
+            raise CommandError(f'Файл не разобрать: {error}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            # Пачки до ошибки уже записаны: профили, ленты подписок и
+            # кеш лент нужно привести в порядок и в этом случае.
+            imported = importer.finish()
+        summary = ', '.join(
+            f'{kind}: {imported[kind]}' for kind in KINDS
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано {summary}; пропущено строк: {importer.skipped}'
+        ))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from posts.signals import cached_feeds
+from posts.storage import is_content_name
+from posts.thumbnails import release_image
+from posts.utils import bump_feed_versions
+
+BATCH_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов из плоского каталога в хранилище '
+        'с адресацией по содержимому'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько постов переносить в одной транзакции',
+        )
+
+    def moved(self, old_name, feeds):
+        release_image(old_name)
+        bump_feed_versions(*feeds)
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        last_pk = 0
+        moved = missing = 0
+        while True:
+            rows = list(
+                Post.objects.filter(pk__gt=last_pk).exclude(image='')
+                .order_by('pk')
+                .values_list('pk', 'image')[:options['batch_size']]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            old_names = {
+                name for pk, name in rows if not is_content_name(name)
+            }
+            with transaction.atomic():
+                for old_name in sorted(old_names):
+                    if not storage.exists(old_name):
+                        missing += 1
+                        self.stderr.write(f'Нет файла {old_name}')
+                        continue
+                    with storage.open(old_name) as content:
+                        new_name = storage.save(old_name, content)
+                    posts = Post.objects.filter(image=old_name)
+                    feeds = set()
+                    for pk, author_id, group_id in posts.values_list(
+                        'pk', 'author_id', 'group_id'
+                    ):
+                        feeds.update(
+                            [f'post:{pk}', *cached_feeds(author_id, group_id)]
+                        )
+                    moved += posts.update(image=new_name)
+                    transaction.on_commit(
+                        lambda name=old_name, feeds=feeds: self.moved(
+                            name, feeds
+                        )
+                    )
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено постов: {moved}, не найдено файлов: {missing}'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.search import BATCH_SIZE, rebuild_index, search_available
+
+
+class Command(BaseCommand):
+    help = 'Заново строит полнотекстовый индекс постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько постов индексировать в одной транзакции',
+        )
+
+    def handle(self, *args, **options):
+        if not search_available():
+            raise CommandError('Полнотекстовый индекс есть только в SQLite')
+        indexed = rebuild_index(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано постов: {indexed}'
+        ))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.timeline import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            type=int,
+            action='append',
+            dest='user_ids',
+            help='id пользователя; по умолчанию пересобираются все ленты',
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild(options['user_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано лент подписок: {count}')
+        )
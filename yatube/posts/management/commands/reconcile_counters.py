@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import BATCH_SIZE, reconcile_posts, reconcile_profiles
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=BATCH_SIZE,
+            help='Сколько строк проверять за один запрос',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        profiles = reconcile_profiles(batch_size)
+        posts = reconcile_posts(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено профилей: {profiles}, постов: {posts}'
+        ))
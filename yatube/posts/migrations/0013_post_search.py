@@ -0,0 +1,87 @@
+from django.conf import settings
+from django.db import migrations
+
+AUTHOR = "{row}.username || ' ' || {row}.first_name || ' ' || {row}.last_name"
+AUTHOR_OF_POST = (
+    '(SELECT ' + AUTHOR.format(row='author') + ' FROM auth_user author '
+    'WHERE author.id = NEW.author_id)'
+)
+GROUP_OF_POST = (
+    "coalesce((SELECT title FROM posts_group WHERE id = NEW.group_id), '')"
+)
+
+FORWARD = [
+    "CREATE VIRTUAL TABLE posts_post_search USING fts5("
+    "text, author, group_title, tokenize='unicode61 remove_diacritics 2')",
+    "INSERT INTO posts_post_search (posts_post_search, rank) "
+    "VALUES ('rank', 'bm25(1.0, 0.5, 0.5)')",
+    'CREATE TRIGGER posts_post_search_insert AFTER INSERT ON posts_post '
+    'BEGIN '
+    'INSERT INTO posts_post_search (rowid, text, author, group_title) '
+    f'VALUES (NEW.id, NEW.text, {AUTHOR_OF_POST}, {GROUP_OF_POST}); '
+    'END',
+    'CREATE TRIGGER posts_post_search_update '
+    'AFTER UPDATE OF text, author_id, group_id ON posts_post '
+    'WHEN OLD.text IS NOT NEW.text OR OLD.author_id IS NOT NEW.author_id '
+    'OR OLD.group_id IS NOT NEW.group_id '
+    'BEGIN '
+    'UPDATE posts_post_search SET text = NEW.text, '
+    f'author = {AUTHOR_OF_POST}, group_title = {GROUP_OF_POST} '
+    'WHERE rowid = NEW.id; '
+    'END',
+    'CREATE TRIGGER posts_post_search_delete AFTER DELETE ON posts_post '
+    'BEGIN '
+    'DELETE FROM posts_post_search WHERE rowid = OLD.id; '
+    'END',
+    'CREATE TRIGGER posts_post_search_author '
+    'AFTER UPDATE OF username, first_name, last_name ON auth_user '
+    'WHEN OLD.username IS NOT NEW.username '
+    'OR OLD.first_name IS NOT NEW.first_name '
+    'OR OLD.last_name IS NOT NEW.last_name '
+    'BEGIN '
+    'UPDATE posts_post_search SET author = ' + AUTHOR.format(row='NEW') + ' '
+    'WHERE rowid IN (SELECT id FROM posts_post WHERE author_id = NEW.id); '
+    'END',
+    'CREATE TRIGGER posts_post_search_group '
+    'AFTER UPDATE OF title ON posts_group '
+    'WHEN OLD.title IS NOT NEW.title '
+    'BEGIN '
+    'UPDATE posts_post_search SET group_title = NEW.title '
+    'WHERE rowid IN (SELECT id FROM posts_post WHERE group_id = NEW.id); '
+    'END',
+    'INSERT INTO posts_post_search (rowid, text, author, group_title) '
+    'SELECT post.id, post.text, ' + AUTHOR.format(row='author') + ', '
+    "coalesce(grp.title, '') FROM posts_post post "
+    'INNER JOIN auth_user author ON author.id = post.author_id '
+    'LEFT JOIN posts_group grp ON grp.id = post.group_id',
+]
+
+BACKWARD = [
+    'DROP TRIGGER IF EXISTS posts_post_search_insert',
+    'DROP TRIGGER IF EXISTS posts_post_search_update',
+    'DROP TRIGGER IF EXISTS posts_post_search_delete',
+    'DROP TRIGGER IF EXISTS posts_post_search_author',
+    'DROP TRIGGER IF EXISTS posts_post_search_group',
+    'DROP TABLE IF EXISTS posts_post_search',
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0012_post_image_storage'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(FORWARD), run(BACKWARD)),
+    ]
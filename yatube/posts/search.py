@@ -0,0 +1,166 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Виртуальная таблица posts_post_search хранит текст поста, имя автора
+и название группы под rowid, равным id поста. Триггеры из миграции
+0013_post_search держат её в согласии с posts_post, auth_user и
+posts_group, в том числе для bulk_create и update(), мимо сигналов.
+Результаты упорядочены по bm25 (колонка rank) и листаются курсором по
+паре (rank, id), поэтому глубина страницы не влияет на стоимость.
+На других СУБД поиск деградирует до icontains по тексту.
+"""
+import re
+
+from django.db import connection, transaction
+
+from .models import Post
+from .utils import CursorPage, CursorPaginator, pack_token, unpack_token
+
+SEARCH_TABLE = 'posts_post_search'
+BATCH_SIZE = 10000
+INDEX_ROWS_SQL = f'''
+    INSERT INTO {SEARCH_TABLE} (rowid, text, author, group_title)
+    SELECT post.id, post.text,
+           author.username || ' ' || author.first_name
+           || ' ' || author.last_name,
+           coalesce(grp.title, '')
+    FROM posts_post AS post
+    JOIN auth_user AS author ON author.id = post.author_id
+    LEFT JOIN posts_group AS grp ON grp.id = post.group_id
+    WHERE post.id BETWEEN %s AND %s
+'''
+
+
+def search_available():
+    return connection.vendor == 'sqlite'
+
+
+def match_query(query):
+    """Запрос FTS5 из пользовательского ввода: все слова, последнее — префикс.
+
+    Слова берутся в кавычки, поэтому операторы FTS5 во вводе не
+    работают и не ломают запрос.
+    """
+    words = re.findall(r'\w+', query)
+    if not words:
+        return None
+    return ' '.join(f'"{word}"' for word in words) + '*'
+
+
+class SearchPaginator:
+    """Курсорная пагинация результатов поиска, от лучших к худшим."""
+    is_cursor = True
+
+    def __init__(self, query, per_page):
+        self.match = match_query(query)
+        self.per_page = per_page
+
+    def _hits(self, cursor):
+        sql = (
+            f'SELECT rowid, rank FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s'
+        )
+        params = [self.match]
+        order = 'rank, rowid'
+        if cursor is not None:
+            direction, rank, pk = cursor
+            if direction == 'next':
+                sql += ' AND (rank > %s OR (rank = %s AND rowid > %s))'
+            else:
+                sql += ' AND (rank < %s OR (rank = %s AND rowid < %s))'
+                order = 'rank DESC, rowid DESC'
+            params += [rank, rank, pk]
+        sql += f' ORDER BY {order} LIMIT %s'
+        params.append(self.per_page + 1)
+        with connection.cursor() as db:
+            db.execute(sql, params)
+            return db.fetchall()
+
+    @staticmethod
+    def _cursor(token):
+        values = unpack_token(token) if token else None
+        if values is None or len(values) != 3:
+            return None
+        direction, rank, pk = values
+        if direction not in ('next', 'prev'):
+            return None
+        if not isinstance(rank, (int, float)) or not isinstance(pk, int):
+            return None
+        return direction, rank, pk
+
+    def get_page(self, token):
+        cursor = self._cursor(token)
+        hits = self._hits(cursor) if self.match else []
+        if cursor is None or cursor[0] == 'next':
+            has_more = len(hits) > self.per_page
+            has_less = cursor is not None
+            hits = hits[:self.per_page]
+        else:
+            has_more, has_less = True, len(hits) > self.per_page
+            hits = hits[:self.per_page][::-1]
+        posts = Post.objects.select_related('author', 'group').in_bulk(
+            [pk for pk, rank in hits]
+        )
+        rows = [posts[pk] for pk, rank in hits if pk in posts]
+        next_cursor = previous_cursor = None
+        if hits and has_more:
+            next_cursor = pack_token(['next', hits[-1][1], hits[-1][0]])
+        if hits and has_less:
+            previous_cursor = pack_token(['prev', hits[0][1], hits[0][0]])
+        return CursorPage(
+            rows, self, token or '', next_cursor, previous_cursor
+        )
+
+
+def filter_matching(queryset, query):
+    """Оставляет в queryset постов только совпадения с запросом.
+
+    Возвращает None, если полнотекстового индекса нет.
+    """
+    if not search_available():
+        return None
+    match = match_query(query)
+    if match is None:
+        return queryset.none()
+    # filter(pk__in=RawSQL(...)) оборачивает подзапрос в лишние скобки,
+    # и SQLite сравнивает id только с первой строкой подзапроса.
+    return queryset.extra(
+        where=[
+            f'{connection.ops.quote_name(Post._meta.db_table)}.id IN '
+            f'(SELECT rowid FROM {SEARCH_TABLE} '
+            f'WHERE {SEARCH_TABLE} MATCH %s)'
+        ],
+        params=[match],
+    )
+
+
+def search_posts(query, token, per_page):
+    """Страница результатов поиска по тексту, автору и группе."""
+    if search_available():
+        return SearchPaginator(query, per_page).get_page(token)
+    queryset = Post.objects.select_related('author', 'group').filter(
+        text__icontains=query
+    )
+    return CursorPaginator(queryset, per_page).get_page(token)
+
+
+def rebuild_index(batch_size=BATCH_SIZE):
+    """Заново наполняет индекс поиска диапазонами id по batch_size строк."""
+    indexed = 0
+    last_pk = 0
+    with connection.cursor() as db:
+        db.execute(f'DELETE FROM {SEARCH_TABLE}')
+        while True:
+            pks = list(
+                Post.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            with transaction.atomic():
+                db.execute(INDEX_ROWS_SQL, [pks[0], pks[-1]])
+            indexed += len(pks)
+            last_pk = pks[-1]
+        db.execute(
+            f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"
+        )
+    return indexed
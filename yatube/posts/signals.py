@@ -0,0 +1,137 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import thumbnails, timeline
+from .counters import bump_post, bump_profile
+from .models import Comment, Follow, Post, Profile
+from .storage import is_content_name
+from .utils import bump_feed_versions, invalidate_feed_counts
+
+User = get_user_model()
+
+
+def follower_ids(author_id):
+    return list(
+        Follow.objects.filter(author_id=author_id)
+        .values_list('user_id', flat=True)
+    )
+
+
+def post_feeds(post, group_id, followers):
+    """Ленты, в которых виден пост: общая, группы, автора и подписчиков."""
+    feeds = ['index', f'author:{post.author_id}']
+    if group_id is not None:
+        feeds.append(f'group:{group_id}')
+    feeds.extend(f'follow:{user_id}' for user_id in followers)
+    return feeds
+
+
+def cached_feeds(author_id, *group_ids):
+    """Ленты с кешем фрагментов, на которых показывается карточка поста."""
+    feeds = ['index', f'author:{author_id}']
+    feeds.extend(
+        f'group:{group_id}' for group_id in set(group_ids)
+        if group_id is not None
+    )
+    return feeds
+
+
+def post_changed(post_id):
+    post = Post.objects.filter(pk=post_id).values_list(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        bump_feed_versions(f'post:{post_id}', *cached_feeds(*post))
+
+
+def follow_changed(follow):
+    invalidate_feed_counts(f'follow:{follow.user_id}')
+    bump_feed_versions(
+        f'follow:{follow.user_id}', f'followers:{follow.author_id}'
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._saved_group_id, instance._saved_image = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list('group_id', 'image').first()
+        if instance.pk else None
+    ) or (None, '')
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    old_group_id = getattr(instance, '_saved_group_id', None)
+    bump_feed_versions(
+        f'post:{instance.pk}',
+        *cached_feeds(instance.author_id, instance.group_id, old_group_id)
+    )
+    if created:
+        bump_profile(instance.author_id, 'posts_count')
+        followers = follower_ids(instance.author_id)
+        timeline.fan_out(instance, followers)
+        invalidate_feed_counts(
+            *post_feeds(instance, instance.group_id, followers)
+        )
+    elif old_group_id != instance.group_id:
+        feeds = [f'group:{instance.group_id}'] if instance.group_id else []
+        if old_group_id is not None:
+            feeds.append(f'group:{old_group_id}')
+        invalidate_feed_counts(*feeds)
+    old_image = getattr(instance, '_saved_image', '')
+    if is_content_name(old_image) and old_image != instance.image.name:
+        transaction.on_commit(lambda: thumbnails.release_image(old_image))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    bump_profile(instance.author_id, 'posts_count', -1)
+    bump_feed_versions(
+        f'post:{instance.pk}',
+        *cached_feeds(instance.author_id, instance.group_id)
+    )
+    invalidate_feed_counts(*post_feeds(
+        instance, instance.group_id, follower_ids(instance.author_id)
+    ))
+    image = instance.image.name
+    if is_content_name(image):
+        transaction.on_commit(lambda: thumbnails.release_image(image))
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    if created:
+        bump_profile(instance.author_id, 'followers_count')
+        bump_profile(instance.user_id, 'following_count')
+        timeline.backfill(instance.user_id, instance.author_id)
+    follow_changed(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    bump_profile(instance.author_id, 'followers_count', -1)
+    bump_profile(instance.user_id, 'following_count', -1)
+    timeline.drop(instance.user_id, instance.author_id)
+    follow_changed(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        bump_post(instance.post_id)
+        post_changed(instance.post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    bump_post(instance.post_id, -1)
+    post_changed(instance.post_id)
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, **kwargs):
+    if created:
+        Profile.objects.get_or_create(user=instance)
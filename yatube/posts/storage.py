@@ -0,0 +1,52 @@
+"""Хранилище картинок постов с адресацией по содержимому.
+
+Файл называется по SHA-256 своего содержимого и лежит в двухуровневом
+шардированном каталоге: posts/ab/cd/abcd....jpg. Одинаковые картинки
+превращаются в один файл, на который ссылаются несколько постов; файл
+удаляется вместе с последним постом, который на него ссылается.
+"""
+import hashlib
+import os
+import re
+
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CONTENT_NAME = re.compile(
+    r'(?:^|/)([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}(?:\.\w+)?$'
+)
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def is_content_name(name):
+    return bool(name) and CONTENT_NAME.search(name) is not None
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage, где имя файла — хеш его содержимого."""
+
+    def content_name(self, name, digest):
+        directory = os.path.dirname(name)
+        extension = os.path.splitext(name)[1].lower()
+        return os.path.join(
+            directory, digest[:2], digest[2:4], f'{digest}{extension}'
+        ).replace('\\', '/')
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content_digest(content))
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
@@ -0,0 +1,21 @@
+from django import template
+
+from posts.thumbnails import get_post_picture, get_post_pictures
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_pictures(posts, profile='card'):
+    """Миниатюры всей страницы ленты одним обращением к хранилищу."""
+    return get_post_pictures(posts, profile)
+
+
+@register.simple_tag(takes_context=True)
+def post_picture(context, post, profile='card'):
+    """Миниатюра поста: из пакета post_pictures, если он есть."""
+    pictures = context.get('post_pictures')
+    if pictures is not None:
+        return pictures.get(post.pk)
+    return get_post_picture(post, profile)
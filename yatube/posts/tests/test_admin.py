@@ -0,0 +1,136 @@
+from unittest import skipUnless
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..utils import estimated_count
+
+User = get_user_model()
+
+
+class PostAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {number}',
+                slug=f'group-{number}',
+                description='Описание',
+            )
+            for number in range(3)
+        ]
+        cls.url = reverse('admin:posts_post_changelist')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def create_posts(self, count, text='Пост'):
+        Post.objects.bulk_create([
+            Post(text=text, author=self.admin, group=self.groups[0])
+            for _ in range(count)
+        ])
+
+    def changelist_queries(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in queries]
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        """Число запросов списка не зависит от числа строк"""
+        self.create_posts(3)
+        few = self.changelist_queries()
+        self.create_posts(30)
+        self.assertEqual(len(self.changelist_queries()), len(few))
+
+    def test_search_uses_full_text_index(self):
+        """Поиск в админке идёт по индексу, а не через LIKE"""
+        self.create_posts(2, text='Щука на рассвете')
+        self.create_posts(2, text='Окунь')
+        response = self.client.get(self.url, {'q': 'щука'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        queries = self.changelist_queries(q='щука')
+        self.assertTrue(any('posts_post_search' in sql for sql in queries))
+        self.assertFalse(any('LIKE' in sql for sql in queries))
+
+    def test_estimated_count_from_statistics(self):
+        """Оценка числа строк берётся из статистики после ANALYZE"""
+        self.create_posts(7)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        self.assertEqual(estimated_count(Post), 7)
+
+
+class CommentFollowAdminTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.users = [
+            User.objects.create_user(
+                f'reader{number}', f'r{number}@example.com'
+            )
+            for number in range(20)
+        ]
+        cls.post = Post.objects.create(text='Пост', author=cls.admin)
+        cls.comment = Comment.objects.create(
+            text='Комментарий', author=cls.users[0], post=cls.post
+        )
+        cls.follow = Follow.objects.create(
+            user=cls.users[1], author=cls.admin
+        )
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_change_form_does_not_list_all_users(self):
+        """В форме комментария нет выпадающих списков всех строк"""
+        response = self.client.get(reverse(
+            'admin:posts_comment_change', args=(self.comment.pk,)
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'reader19')
+
+    def test_user_autocomplete_by_prefix(self):
+        """Автодополнение пользователей ищет по префиксу имени"""
+        response = self.client.get(
+            reverse('admin:auth_user_autocomplete'), {'term': 'reader1'}
+        )
+        names = {item['text'] for item in response.json()['results']}
+        self.assertEqual(names, {'reader1'} | {
+            f'reader{number}' for number in range(10, 20)
+        })
+
+    @skipUnless(
+        connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite'
+    )
+    def test_prefix_search_uses_indexes(self):
+        """Поиск по имени и почте не сканирует таблицы целиком"""
+        cases = (
+            (Follow, 'reader1'), (Comment, 'reader0'), (User, 'r15@'),
+        )
+        for model, term in cases:
+            with self.subTest(model=model.__name__):
+                model_admin = admin.site._registry[model]
+                queryset, distinct = model_admin.get_search_results(
+                    None, model.objects.all(), term
+                )
+                self.assertEqual(queryset.count(), 1)
+                sql, params = queryset.query.sql_with_params()
+                with connection.cursor() as cursor:
+                    cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                    plan = ' '.join(row[-1] for row in cursor.fetchall())
+                self.assertNotIn('SCAN', plan.replace('LIST SUBQUERY', ''))
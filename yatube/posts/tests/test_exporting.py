@@ -0,0 +1,119 @@
+import csv
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..exporting import export_lines, export_rows
+from ..models import Comment, Group, Post
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+class ExportDataTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {number}',
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+            )
+            for number in range(5)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Комментарий'
+        )
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def test_rows_are_read_in_keyset_batches(self):
+        """Выгрузка идёт пачками по id, по запросу на пачку"""
+        with self.assertNumQueries(3):
+            rows = list(export_rows('post', batch_size=2))
+        self.assertEqual(
+            [row['id'] for row in rows], [post.pk for post in self.posts]
+        )
+        self.assertEqual(rows[1]['author'], 'author')
+        self.assertEqual(rows[1]['group'], 'group')
+        self.assertIsNone(rows[0]['group'])
+        self.assertEqual(rows[0]['comments_count'], 1)
+
+    def test_jsonl_lines(self):
+        """Каждая строка JSONL — отдельная запись с типом"""
+        lines = list(export_lines('comment', 'jsonl'))
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(record['type'], 'comment')
+        self.assertEqual(record['post'], self.posts[0].pk)
+        self.assertEqual(record['text'], 'Комментарий')
+
+    def test_command_writes_csv(self):
+        """Команда пишет CSV с заголовком в файл"""
+        path = os.path.join(TEMP_DIR, 'posts.csv')
+        call_command('export_data', 'post', format='csv', output=path,
+                     batch_size=2)
+        with open(path, newline='', encoding='utf-8') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(len(rows), len(self.posts))
+        self.assertEqual(rows[0]['type'], 'post')
+        self.assertEqual(rows[0]['text'], 'Пост 0')
+
+    def test_command_writes_stdout(self):
+        """Без --output выгрузка идёт в стандартный вывод"""
+        out = StringIO()
+        call_command('export_data', 'comment', stdout=out)
+        self.assertIn('Комментарий', out.getvalue())
+
+    def test_endpoint_streams_for_staff(self):
+        """Сотрудник получает потоковую выгрузку"""
+        client = Client()
+        client.force_login(self.staff)
+        response = client.get(
+            reverse('posts:export', kwargs={'kind': 'post'}),
+            {'format': 'csv'},
+        )
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('posts.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), len(self.posts) + 1)
+
+    def test_endpoint_is_for_staff_only(self):
+        """Обычный пользователь отправляется на вход в админку"""
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(
+            reverse('posts:export', kwargs={'kind': 'post'})
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn(reverse('admin:login'), response.url)
+
+    def test_endpoint_unknown_kind(self):
+        """Неизвестный тип или формат выгрузки — 404"""
+        client = Client()
+        client.force_login(self.staff)
+        for kind, params in (('user', {}), ('post', {'format': 'xml'})):
+            with self.subTest(kind=kind, params=params):
+                response = client.get(
+                    reverse('posts:export', kwargs={'kind': kind}), params
+                )
+                self.assertEqual(response.status_code, 404)
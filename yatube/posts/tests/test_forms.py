@@ -1,20 +1,42 @@
+import os
 import shutil
 import tempfile
+from io import BytesIO, StringIO
 
 from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase, Client, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from PIL import Image
 
 from ..models import Post, Group, Comment
+from ..storage import is_content_name
+from ..thumbnails import release_image
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
 
 User = get_user_model()
 
 
-@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POSTS_THUMBNAIL_WORKERS=0,
+    POSTS_THUMBNAIL_KVSTORE_PATH=os.path.join(
+        TEMP_MEDIA_ROOT, 'thumbnails.sqlite3'
+    ),
+)
 class PostCreateFormTests(TestCase):
     @classmethod
     def setUpClass(cls):
@@ -48,17 +70,9 @@ class PostCreateFormTests(TestCase):
 
     def test_create_post(self):
         post_count = Post.objects.count()
-        small_gif = (
-            b'\x47\x49\x46\x38\x39\x61\x02\x00'
-            b'\x01\x00\x80\x00\x00\x00\x00\x00'
-            b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
-            b'\x00\x00\x00\x2C\x00\x00\x00\x00'
-            b'\x02\x00\x01\x00\x00\x02\x02\x0C'
-            b'\x0A\x00\x3B'
-        )
         uploaded = SimpleUploadedFile(
             name='small.gif',
-            content=small_gif,
+            content=SMALL_GIF,
             content_type='image/gif'
         )
         form_data = {
@@ -71,12 +85,99 @@ class PostCreateFormTests(TestCase):
             follow=True
         )
         self.assertEqual(Post.objects.count(), post_count + 1)
-        self.assertTrue(
-            Post.objects.filter(
-                text='Тестовый текст',
-                image='posts/small.gif',
-            ).exists()
+        post = Post.objects.get(text='Тестовый текст')
+        self.assertTrue(post.image.name.startswith('posts/'))
+        self.assertTrue(post.image.name.endswith('.gif'))
+        self.assertTrue(is_content_name(post.image.name))
+
+    def test_identical_images_share_file(self):
+        """Одинаковые картинки хранятся одним файлом до последней ссылки"""
+        first, second = [
+            Post.objects.create(
+                text=f'Копия {number}',
+                author=self.user,
+                image=SimpleUploadedFile(
+                    name=f'copy{number}.gif',
+                    content=SMALL_GIF,
+                    content_type='image/gif'
+                ),
+            )
+            for number in range(2)
+        ]
+        self.assertEqual(first.image.name, second.image.name)
+        storage = first.image.storage
+        first.delete()
+        release_image(second.image.name)
+        self.assertTrue(storage.exists(second.image.name))
+        second.delete()
+        release_image(second.image.name)
+        self.assertFalse(storage.exists(second.image.name))
+
+    def test_migrate_image_paths(self):
+        """Команда переносит картинки из плоского каталога"""
+        FileSystemStorage().save('posts/legacy.gif', ContentFile(SMALL_GIF))
+        post = Post.objects.create(
+            text='Старый пост', author=self.user, image='posts/legacy.gif'
         )
+        call_command('migrate_image_paths', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertTrue(is_content_name(post.image.name))
+        self.assertTrue(post.image.storage.exists(post.image.name))
+        release_image('posts/legacy.gif')
+        self.assertFalse(post.image.storage.exists('posts/legacy.gif'))
+
+    def upload_jpeg(self, size, image_format='JPEG', **options):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, image_format, **options)
+        extension = image_format.lower()
+        image = SimpleUploadedFile(
+            name=f'photo.{extension}',
+            content=buffer.getvalue(),
+            content_type=f'image/{extension}'
+        )
+        return self.authorized_client.post(
+            reverse('posts:post_create'),
+            data={'text': 'Фото', 'image': image},
+        )
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=10 ** 6)
+    def test_image_over_pixel_budget_rejected(self):
+        """Картинка больше бюджета точек не принимается"""
+        response = self.upload_jpeg((1001, 1000))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка слишком большая: не больше 1 мегапикселей.'
+        )
+        self.assertFalse(Post.objects.filter(text='Фото').exists())
+
+    @override_settings(POSTS_IMAGE_MAX_SIDE=16)
+    def test_image_downscaled_to_master(self):
+        """Сохраняется уменьшенный мастер картинки"""
+        self.upload_jpeg((64, 32))
+        post = Post.objects.get(text='Фото')
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (16, 8))
+
+    def test_image_exif_applied_and_stripped(self):
+        """Поворот по EXIF применяется, метаданные не сохраняются"""
+        camera = Image.Exif()
+        camera[0x010F] = 'SecretCam'
+        exif = Image.Exif()
+        exif[0x010F] = 'SecretCam'
+        exif[0x0112] = 6
+        # Pillow не поворачивает TIFF по EXIF, но метаданные снимает.
+        for image_format, options, size in (
+            ('JPEG', {'exif': exif.tobytes()}, (20, 40)),
+            ('PNG', {'exif': exif.tobytes()}, (20, 40)),
+            ('TIFF', {'tiffinfo': camera}, (40, 20)),
+        ):
+            with self.subTest(image_format=image_format):
+                self.upload_jpeg((40, 20), image_format, **options)
+                post = Post.objects.filter(text='Фото').latest('pk')
+                with Image.open(post.image.path) as image:
+                    self.assertEqual(image.size, size)
+                    self.assertNotIn('exif', image.info)
+                    self.assertFalse(image.getexif())
 
     def test_post_edit(self):
         posts_count = Post.objects.count()
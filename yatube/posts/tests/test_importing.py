@@ -0,0 +1,149 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, Profile, TimelineEntry
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+OLD_DATE = datetime(2015, 6, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class ImportDataTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def write(self, name, text):
+        path = os.path.join(TEMP_DIR, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(text)
+        return path
+
+    def import_file(self, path, **options):
+        out = StringIO()
+        call_command('import_data', path, batch_size=2, stdout=out, **options)
+        return out.getvalue()
+
+    def test_jsonl_import(self):
+        """Импорт JSONL разрешает ссылки внутри файла и хранит даты"""
+        records = [
+            {'type': 'user', 'username': 'writer', 'first_name': 'Лев'},
+            {'type': 'user', 'username': 'reader'},
+            {'type': 'group', 'slug': 'fishing', 'title': 'Рыбалка'},
+            *(
+                {
+                    'type': 'post', 'author': 'writer', 'group': 'fishing',
+                    'text': f'Импортированный пост {number}',
+                    'pub_date': OLD_DATE.isoformat(),
+                }
+                for number in range(5)
+            ),
+            {'type': 'post', 'author': 'ghost', 'text': 'Без автора'},
+            {'type': 'follow', 'user': 'reader', 'author': 'writer'},
+        ]
+        path = self.write('data.jsonl', ''.join(
+            json.dumps(record, ensure_ascii=False) + '\n'
+            for record in records
+        ))
+        output = self.import_file(path)
+        writer = User.objects.get(username='writer')
+        reader = User.objects.get(username='reader')
+        self.assertEqual(writer.posts.count(), 5)
+        self.assertEqual(
+            set(writer.posts.values_list('pub_date', flat=True)), {OLD_DATE}
+        )
+        self.assertEqual(
+            Group.objects.get(slug='fishing').posts.count(), 5
+        )
+        self.assertTrue(Follow.objects.filter(
+            user=reader, author=writer
+        ).exists())
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=reader).count(), 5
+        )
+        profile = Profile.objects.get(user=writer)
+        self.assertEqual(profile.posts_count, 5)
+        self.assertEqual(profile.followers_count, 1)
+        self.assertIn('Строка 9 пропущена', output)
+        self.assertIn('пропущено строк: 1', output)
+
+    def test_import_refreshes_cached_feeds(self):
+        """После импорта закешированная лента показывает новые посты"""
+        author = User.objects.create_user(username='author')
+        cache.clear()
+        Client().get(reverse('posts:index'))
+        path = self.write('posts.jsonl', json.dumps(
+            {'type': 'post', 'author': 'author', 'text': 'Свежий импорт'},
+            ensure_ascii=False,
+        ))
+        self.import_file(path)
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, 'Свежий импорт')
+        self.assertEqual(author.posts.count(), 1)
+
+    def test_csv_import_with_kind(self):
+        """CSV без поля type импортируется с --kind"""
+        User.objects.create_user(username='author')
+        path = self.write(
+            'posts.csv',
+            'author,text,pub_date\n'
+            f'author,Первый,{OLD_DATE.isoformat()}\n'
+            'author,Второй,\n'
+            'author,Третий,вчера\n'
+        )
+        output = self.import_file(path, kind='post')
+        self.assertEqual(
+            list(Post.objects.order_by('pk').values_list('text', flat=True)),
+            ['Первый', 'Второй'],
+        )
+        self.assertEqual(Post.objects.get(text='Первый').pub_date, OLD_DATE)
+        self.assertIn('Строка 4 пропущена', output)
+
+    def test_existing_users_are_reused(self):
+        """Уже существующие пользователи и группы не дублируются"""
+        User.objects.create_user(username='author')
+        path = self.write('users.jsonl', '\n'.join([
+            json.dumps({'type': 'user', 'username': 'author'}),
+            json.dumps({'type': 'user', 'username': 'author'}),
+            json.dumps({'type': 'post', 'author': 'author', 'text': 'x'}),
+        ]))
+        self.import_file(path)
+        self.assertEqual(User.objects.filter(username='author').count(), 1)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_duplicate_follows_are_not_counted(self):
+        """Подписки, пропущенные как дубликаты, не считаются импортом"""
+        reader = User.objects.create_user(username='reader')
+        author = User.objects.create_user(username='author')
+        Follow.objects.create(user=reader, author=author)
+        follow = json.dumps(
+            {'type': 'follow', 'user': 'reader', 'author': 'author'}
+        )
+        path = self.write('follows.jsonl', '\n'.join([follow, follow]))
+        output = self.import_file(path)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertIn('follow: 0', output)
+
+    def test_parse_error_still_finishes_import(self):
+        """Ошибка разбора не оставляет записанные посты без профилей"""
+        author = User.objects.create_user(username='author')
+        post = json.dumps({'type': 'post', 'author': 'author', 'text': 'x'})
+        path = self.write('broken.jsonl', '\n'.join([post, post, '{']))
+        with self.assertRaises(CommandError):
+            self.import_file(path)
+        self.assertEqual(author.posts.count(), 2)
+        self.assertEqual(Profile.objects.get(user=author).posts_count, 2)
@@ -0,0 +1,74 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..kvstore import SQLiteKVStore
+
+TEMP_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    POSTS_THUMBNAIL_KVSTORE_PATH=os.path.join(TEMP_DIR, 'kvstore.sqlite3'),
+    POSTS_THUMBNAIL_LRU_SIZE=2,
+)
+class SQLiteKVStoreTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+    def setUp(self):
+        self.store = SQLiteKVStore()
+        self.other_process = SQLiteKVStore()
+        self.store._delete_raw(*self.store._find_keys_raw(''))
+
+    def test_values_are_shared_through_file(self):
+        """Запись одного процесса видна другому"""
+        self.store._set_raw('key', 'value')
+        self.assertEqual(self.other_process._get_raw('key'), 'value')
+
+    def test_miss_is_not_remembered(self):
+        """Промах не прячет значение, записанное другим процессом"""
+        self.assertIsNone(self.store._get_raw('key'))
+        self.other_process._set_raw('key', 'value')
+        self.assertEqual(self.store._get_raw('key'), 'value')
+
+    def test_lru_entries_expire(self):
+        """Удаление в другом процессе видно, когда запись LRU устарела"""
+        self.store._set_raw('key', 'value')
+        self.other_process._delete_raw('key')
+        self.assertEqual(self.store._get_raw('key'), 'value')
+        with self.settings(POSTS_THUMBNAIL_LRU_TTL=0):
+            self.store._set_raw('key', 'value')
+            self.other_process._delete_raw('key')
+            self.assertIsNone(self.store._get_raw('key'))
+
+    def test_lru_is_bounded(self):
+        """LRU не растёт больше POSTS_THUMBNAIL_LRU_SIZE"""
+        for number in range(5):
+            self.store._set_raw(f'key{number}', 'value')
+        self.assertEqual(self.store.metrics()['lru_size'], 2)
+        self.store.get_raw_many(['key4', 'key0'])
+        self.assertEqual(self.store.metrics()['lru_hits'], 1)
+        self.assertEqual(self.store.metrics()['file_hits'], 1)
+
+    def test_find_keys_by_prefix(self):
+        """Поиск по префиксу не путает _ и % с подстановками"""
+        self.store._set_raw('sorl||image||a', 'value')
+        self.store._set_raw('sorlXimage', 'value')
+        self.assertEqual(
+            self.store._find_keys_raw('sorl||image||'), ['sorl||image||a']
+        )
+
+    def test_metrics_view(self):
+        """Счётчики отдаются только с внутренних адресов"""
+        url = reverse('posts:thumbnail_metrics')
+        response = Client().get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'yatube_thumbnail_kvstore_')
+        response = Client(REMOTE_ADDR='10.0.0.1').get(url)
+        self.assertEqual(response.status_code, 404)
@@ -1,7 +1,10 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Comment, Follow, Group, Post, Profile
 
 User = get_user_model()
 
@@ -57,3 +60,49 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expect_value
                 )
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Да')
+        Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            Profile.objects.values_list(
+                'posts_count', 'followers_count', 'following_count',
+            ).get(user=self.author),
+            (1, 1, 0)
+        )
+        Follow.objects.all().delete()
+        post.delete()
+        self.assertEqual(
+            Profile.objects.values_list(
+                'posts_count', 'followers_count', 'following_count',
+            ).get(user=self.author),
+            (0, 0, 0)
+        )
+        self.assertEqual(
+            Profile.objects.get(user=self.reader).following_count, 0
+        )
+
+    def test_reconcile_counters_fixes_drift(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        Comment.objects.create(post=post, author=self.reader, text='Да')
+        Profile.objects.filter(user=self.author).update(posts_count=7)
+        Post.objects.filter(pk=post.pk).update(comments_count=0)
+        Profile.objects.filter(user=self.reader).delete()
+        call_command('reconcile_counters', batch_size=1, stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(
+            Profile.objects.get(user=self.author).posts_count, 1
+        )
+        self.assertTrue(Profile.objects.filter(user=self.reader).exists())
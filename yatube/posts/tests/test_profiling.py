@@ -0,0 +1,112 @@
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.profiling import PROFILE_PARAM, list_profiles, make_token
+from ..models import Post
+
+PROFILING_DIR = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(PROFILING_DIR=PROFILING_DIR, PROFILING_KEEP=2)
+class ProfilingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        cls.user = User.objects.create_user(username='user')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+        cls.url = reverse('posts:index')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(PROFILING_DIR, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(PROFILING_DIR, ignore_errors=True)
+        self.staff_client = Client()
+        self.staff_client.force_login(self.staff)
+
+    def test_staff_token_profiles_request(self):
+        """Запрос с токеном сотрудника сохраняет профиль и SQL"""
+        response = self.staff_client.get(
+            self.url, {PROFILE_PARAM: make_token(self.staff)}
+        )
+        profile_id = response['X-Profile-Id']
+        [meta] = list_profiles()
+        self.assertEqual(meta['id'], profile_id)
+        self.assertEqual(meta['path'], self.url)
+        self.assertGreater(meta['queries'], 0)
+        with open(os.path.join(PROFILING_DIR, f'{profile_id}.sql')) as sql:
+            self.assertIn('SELECT', sql.read())
+
+    def test_header_token(self):
+        """Токен можно передать в заголовке X-Profile"""
+        response = self.staff_client.get(
+            self.url, HTTP_X_PROFILE=make_token(self.staff)
+        )
+        self.assertIn('X-Profile-Id', response)
+
+    def test_request_without_valid_token_is_not_profiled(self):
+        """Без токена, с чужим или битым токеном профиль не снимается"""
+        client = Client()
+        client.force_login(self.user)
+        cases = (
+            (self.staff_client, {}),
+            (self.staff_client, {PROFILE_PARAM: 'broken'}),
+            (self.staff_client, {PROFILE_PARAM: make_token(self.user)}),
+            (client, {PROFILE_PARAM: make_token(self.user)}),
+        )
+        for client, params in cases:
+            with self.subTest(params=params):
+                response = client.get(self.url, params)
+                self.assertNotIn('X-Profile-Id', response)
+        self.assertEqual(list_profiles(), [])
+
+    def test_only_recent_profiles_are_kept(self):
+        """Старые профили сверх PROFILING_KEEP удаляются"""
+        params = {PROFILE_PARAM: make_token(self.staff)}
+        ids = [
+            self.staff_client.get(self.url, params)['X-Profile-Id']
+            for _ in range(3)
+        ]
+        self.assertEqual(
+            [meta['id'] for meta in list_profiles()], ids[:0:-1]
+        )
+        self.assertEqual(len(os.listdir(PROFILING_DIR)), 6)
+
+    def test_admin_lists_and_serves_profiles(self):
+        """Админка показывает профили и отдаёт их файлы"""
+        response = self.staff_client.get(
+            self.url, {PROFILE_PARAM: make_token(self.staff)}
+        )
+        profile_id = response['X-Profile-Id']
+        response = self.staff_client.get(reverse('core:profile_list'))
+        self.assertContains(response, profile_id)
+        for kind in ('txt', 'prof', 'sql'):
+            with self.subTest(kind=kind):
+                response = self.staff_client.get(reverse(
+                    'core:profile_download', args=[profile_id, kind]
+                ))
+                self.assertEqual(response.status_code, 200)
+        response = self.staff_client.get(reverse(
+            'core:profile_download', args=['settings', 'py']
+        ))
+        self.assertEqual(response.status_code, 404)
+
+    def test_admin_is_staff_only(self):
+        """Обычного пользователя админка отправляет на вход"""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('core:profile_list'))
+        self.assertEqual(response.status_code, 302)
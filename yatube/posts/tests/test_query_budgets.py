@@ -0,0 +1,179 @@
+import os
+import shutil
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.queries import QueryBudgetExceeded, budget_for, query_budget
+from posts.urls import urlpatterns as posts_urls
+from users.urls import urlpatterns as users_urls
+from ..models import Comment, Follow, Group, Post
+from ..utils import COMMENTS_PAGINATION, PAGINATION
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+User = get_user_model()
+
+
+@override_settings(
+    POSTS_THUMBNAIL_WORKERS=0,
+    POSTS_THUMBNAIL_KVSTORE_PATH=os.path.join(
+        TEMP_MEDIA_ROOT, 'thumbnails.sqlite3'
+    ),
+)
+class QueryBudgetTest(TestCase):
+    """Страницы укладываются в бюджеты запросов на полноразмерных лентах.
+
+    Постов больше, чем помещается на страницу, у каждого свои автор,
+    группа и комментарии, поэтому любой N+1 выводит страницу за бюджет.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com'
+        )
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        groups = [
+            Group.objects.create(
+                title=f'Группа {number}',
+                slug=f'group-{number}',
+                description='Описание',
+            )
+            for number in range(3)
+        ]
+        for author in authors[:2]:
+            Follow.objects.create(user=cls.user, author=author)
+        cls.author = authors[0]
+        cls.group = groups[0]
+        for number in range(PAGINATION * 2):
+            Post.objects.create(
+                text=f'Тестовый пост {number}',
+                author=authors[number % len(authors)],
+                group=groups[number % len(groups)],
+            )
+        cls.post = Post.objects.create(text='Свой пост', author=cls.user)
+        for number in range(COMMENTS_PAGINATION + 5):
+            Comment.objects.create(
+                post=cls.post,
+                author=authors[number % len(authors)],
+                text=f'Комментарий {number}',
+            )
+        cls.url_kwargs = {
+            'posts:group_list': {'slug': cls.group.slug},
+            'posts:profile': {'username': cls.author.username},
+            'posts:post_detail': {'post_id': cls.post.pk},
+            'posts:post_edit': {'post_id': cls.post.pk},
+            'posts:post_comments': {'post_id': cls.post.pk},
+            'posts:add_comment': {'post_id': cls.post.pk},
+            'posts:export': {'kind': 'post'},
+            'posts:group_rss': {'slug': cls.group.slug},
+            'posts:group_atom': {'slug': cls.group.slug},
+            'posts:profile_rss': {'username': cls.author.username},
+            'posts:profile_atom': {'username': cls.author.username},
+            'posts:profile_follow': {'username': authors[2].username},
+            'posts:profile_unfollow': {'username': cls.author.username},
+            'users:password_reset_confirm': {
+                'uidb64': urlsafe_base64_encode(force_bytes(cls.user.pk)),
+                'token': default_token_generator.make_token(cls.user),
+            },
+        }
+        cls.url_params = {'posts:search': {'q': 'пост'}}
+        # Страницы записи проверяются POST-запросом, то есть самой записью.
+        cls.url_data = {
+            'posts:post_create': {'text': 'Новый пост'},
+            'posts:post_edit': {'text': 'Правка', 'group': cls.group.pk},
+            'posts:add_comment': {'text': 'Новый комментарий'},
+        }
+        cls.url_users = {'posts:export': cls.staff}
+        cls.url_statuses = {
+            'posts:post_create': HTTPStatus.FOUND,
+            'posts:post_edit': HTTPStatus.FOUND,
+            'posts:add_comment': HTTPStatus.FOUND,
+            'posts:profile_follow': HTTPStatus.FOUND,
+            'posts:profile_unfollow': HTTPStatus.FOUND,
+        }
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def url_names(self):
+        return [
+            f'{namespace}:{pattern.name}'
+            for namespace, patterns in (
+                ('posts', posts_urls), ('users', users_urls)
+            )
+            for pattern in patterns
+        ]
+
+    def test_every_url_has_budget(self):
+        """Бюджет задан для каждого имени из posts.urls и users.urls"""
+        for name in self.url_names():
+            with self.subTest(name=name):
+                self.assertIsNotNone(budget_for(name))
+
+    def test_pages_stay_within_budget(self):
+        """Ни одна страница не выходит за свой бюджет с холодным кешем"""
+        for name in self.url_names():
+            with self.subTest(name=name):
+                cache.clear()
+                client = Client()
+                client.force_login(self.url_users.get(name, self.user))
+                url = reverse(name, kwargs=self.url_kwargs.get(name))
+                with query_budget(budget_for(name), name, action='raise'):
+                    if name in self.url_data:
+                        response = client.post(url, self.url_data[name])
+                    else:
+                        response = client.get(
+                            url, self.url_params.get(name, {})
+                        )
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertEqual(
+                    response.status_code,
+                    self.url_statuses.get(name, HTTPStatus.OK)
+                )
+
+    def test_decorator_raises_over_budget(self):
+        """Декоратор поднимает исключение при выходе за бюджет"""
+        @query_budget(1, action='raise')
+        def two_queries():
+            list(Post.objects.all()[:1])
+            list(Group.objects.all()[:1])
+
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'бюджете 1'):
+            two_queries()
+
+    def test_context_manager_warns_over_budget(self):
+        """По умолчанию превышение бюджета только пишется в лог"""
+        with self.assertLogs('core.queries', 'WARNING') as logs:
+            with query_budget(0, 'лента') as counter:
+                Post.objects.exists()
+        self.assertEqual(len(counter), 1)
+        self.assertIn('лента: 1 запросов к базе', logs.output[0])
+
+    @override_settings(
+        DEBUG=True,
+        QUERY_BUDGETS={'posts:index': 0},
+        QUERY_BUDGET_ACTION='raise',
+    )
+    def test_middleware_checks_url_budget_in_debug(self):
+        """В DEBUG middleware сверяет запросы с бюджетом имени URL"""
+        with self.assertRaises(QueryBudgetExceeded):
+            Client().get(reverse('posts:index'))
+        Client().get(reverse('posts:group_list', args=[self.group.slug]))
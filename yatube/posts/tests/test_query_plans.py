@@ -0,0 +1,90 @@
+import re
+from unittest import skipUnless
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Post, Group, Comment, Follow
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+( AS \w+)?$')
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN есть в SQLite')
+class FeedQueryPlanTest(TestCase):
+    """Запросы лент должны идти по индексам, без полного скана и сортировки.
+
+    Для каждой страницы перехватываются реальные SQL-запросы к таблицам
+    posts, и по каждому выполняется EXPLAIN QUERY PLAN.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(user=cls.reader, author=cls.user)
+        for number in range(12):
+            cls.post = Post.objects.create(
+                text=f'Тестовый пост {number}',
+                author=cls.user,
+                group=cls.group,
+            )
+        Comment.objects.create(text='Комментарий', author=cls.reader,
+                               post=cls.post)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def explain(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assert_indexed(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        page_obj = response.context.get('page_obj')
+        for query in queries.captured_queries:
+            if '"posts_' not in query['sql']:
+                continue
+            for step in self.explain(query['sql']):
+                with self.subTest(url=url, params=params, step=step):
+                    self.assertNotRegex(step, FULL_SCAN, query['sql'])
+                    self.assertNotIn('TEMP B-TREE', step, query['sql'])
+        return page_obj
+
+    def test_feeds_use_indexes(self):
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            self.assert_indexed(url)
+            self.assert_indexed(url, {'page': 2})
+            first_page = self.assert_indexed(url, {'cursor': ''})
+            second_page = self.assert_indexed(
+                url, {'cursor': first_page.next_cursor}
+            )
+            self.assert_indexed(
+                url, {'cursor': second_page.previous_cursor}
+            )
+
+    def test_post_detail_uses_indexes(self):
+        self.assert_indexed(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        )
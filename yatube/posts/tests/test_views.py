@@ -1,22 +1,44 @@
+import json
+import os
 import shutil
 import tempfile
+import threading
+from io import StringIO
+from unittest import mock
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
-from django.test import TestCase, Client
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django import forms
+from sorl.thumbnail import default
 
 from posts.forms import PostForm
-from ..models import Post, Group, Comment, Follow
+from posts.utils import COMMENTS_PAGINATION, shared_timeout
+from posts import thumbnails
+from posts.thumbnails import (
+    THUMBNAIL_PROFILES, backend, get_post_picture, profile_variants,
+    render_thumbnails,
+)
+from ..models import Post, Group, Comment, Follow, TimelineEntry
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
 
 User = get_user_model()
 
 
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POSTS_THUMBNAIL_WORKERS=0,
+    POSTS_THUMBNAIL_KVSTORE_PATH=os.path.join(
+        TEMP_MEDIA_ROOT, 'thumbnails.sqlite3'
+    ),
+)
 class PostPagesTest(TestCase):
     @classmethod
     def tearDownClass(cls):
@@ -209,17 +231,66 @@ class PostPagesTest(TestCase):
         )
 
     def test_check_cache(self):
-        """Проверка кеша."""
+        """Проверка кеша: лента берётся из кеша до записи поста."""
         response = self.authorized_client.get(reverse('posts:index'))
         cache_1 = response.content
-        Post.objects.get(id=1).delete()
+        Post.objects.filter(id=1).update(text='Текст мимо сигналов')
         response2 = self.authorized_client.get(reverse('posts:index'))
         cache_2 = response2.content
         self.assertEqual(cache_1, cache_2)
-        cache.clear()
+        Post.objects.get(id=1).delete()
         response3 = self.authorized_client.get(reverse('posts:index'))
         cache_3 = response3.content
         self.assertNotEqual(cache_1, cache_3)
+        self.assertNotContains(response3, 'Текст мимо сигналов')
+
+    def test_feed_cache_is_per_page(self):
+        """Кеш фрагмента ленты свой для каждой страницы."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {e}', author=self.user) for e in range(12)
+        )
+        cache.clear()
+        url = reverse('posts:profile', kwargs={'username': 'NoName'})
+        first = self.authorized_client.get(url)
+        second = self.authorized_client.get(url, {'page': 2})
+        self.assertNotEqual(
+            first.context['feed_cache_key'],
+            second.context['feed_cache_key']
+        )
+        self.assertContains(second, 'Пост 0')
+        self.assertNotContains(first, 'Пост 0<')
+
+    def test_process_local_cache_keeps_shared_keys_short(self):
+        """На locmem общие для процессов ключи живут недолго."""
+        limit = settings.POSTS_LOCAL_CACHE_TIMEOUT
+        self.assertEqual(shared_timeout(None), limit)
+        self.assertEqual(shared_timeout(limit * 10), limit)
+        dummy = {'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        }}
+        with self.settings(CACHES=dummy):
+            self.assertIsNone(shared_timeout(None))
+
+    def test_broken_cursors_share_cache_key(self):
+        """Битые курсоры не заводят свои записи в кеше фрагментов."""
+        url = reverse('posts:profile', kwargs={'username': 'NoName'})
+        keys = {
+            self.authorized_client.get(
+                url, {'cursor': cursor}
+            ).context['feed_cache_key']
+            for cursor in ('', 'garbage', 'more-garbage', 'WyJ4Il0')
+        }
+        self.assertEqual(len(keys), 1)
+
+    def test_feed_cache_shows_edited_post(self):
+        """Правка поста сразу видна на закешированной странице группы."""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        self.authorized_client.get(url)
+        self.authorized_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Исправленный текст', 'group': self.group.pk},
+        )
+        self.assertContains(self.authorized_client.get(url), 'Исправленный')
 
     def test_follow_authorized_page_index(self):
         """Проверка подписки авторизованного пользователя и вывод поста"""
@@ -259,6 +330,134 @@ class PostPagesTest(TestCase):
         ))
         self.assertEqual(Follow.objects.count(), 0)
 
+    def test_new_post_fans_out_to_follower_timeline(self):
+        """Новый пост автора попадает в ленту подписчика сразу при записи"""
+        self.authorized_client.post(
+            reverse('posts:post_create'), data={'text': 'Пост в ленту'}
+        )
+        post = Post.objects.get(text='Пост в ленту')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user_2, post=post).exists()
+        )
+        response = self.authorized_client_2.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['page_obj'][0], post)
+
+    def test_unfollow_cleans_timeline(self):
+        """После отписки посты автора уходят из ленты подписок"""
+        self.authorized_client_2.get(reverse(
+            'posts:profile_unfollow',
+            kwargs={'username': self.user.username}
+        ))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user_2))
+
+    def test_rebuild_timelines_command(self):
+        """rebuild_timelines собирает ленты по подпискам и чистит лишние"""
+        TimelineEntry.objects.filter(user=self.user_2).delete()
+        TimelineEntry.objects.create(
+            user=self.user, post=self.post, author=self.user,
+            pub_date=self.post.pub_date,
+        )
+        call_command('rebuild_timelines', stdout=StringIO())
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('user', 'post')),
+            [(self.user_2.pk, self.post.pk)]
+        )
+
+    def test_thumbnail_is_rendered_ahead_of_request(self):
+        """Страница не делает миниатюру сама, а берёт готовую"""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        self.assertContains(
+            self.authorized_client.get(url), 'thumbnail-placeholder'
+        )
+        render_thumbnails(self.post.image.name, [f'post:{self.post.id}'])
+        picture = get_post_picture(self.post)
+        self.assertIsNotNone(picture)
+        response = self.authorized_client.get(url)
+        self.assertContains(response, picture.img.url)
+        self.assertNotContains(response, 'thumbnail-placeholder')
+
+    def test_thumbnail_srcset(self):
+        """В srcset попадают все ширины профиля, img — самая крупная"""
+        render_thumbnails(self.post.image.name, [f'post:{self.post.id}'])
+        picture = get_post_picture(self.post)
+        widths = THUMBNAIL_PROFILES['card']['widths']
+        self.assertEqual(picture.img.width, max(widths))
+        for width in widths:
+            self.assertIn(f' {width}w', picture.srcset)
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+        )
+        self.assertContains(response, f'srcset="{picture.srcset}"')
+
+    @override_settings(POSTS_THUMBNAIL_WORKERS=1)
+    def test_failed_thumbnails_are_not_resubmitted(self):
+        """Картинку с неудачными миниатюрами не ставят в очередь сразу"""
+        name = self.post.image.name
+        self.addCleanup(cache.delete, thumbnails.failure_key(name))
+        with mock.patch.object(
+            thumbnails, 'render_thumbnails', side_effect=OSError
+        ), self.assertLogs('posts.thumbnails', 'ERROR'):
+            worker = threading.Thread(
+                target=thumbnails._render_in_worker, args=(name, [])
+            )
+            worker.start()
+            worker.join()
+        with mock.patch.object(thumbnails, 'get_executor') as executor:
+            self.assertIsNone(get_post_picture(self.post))
+            executor.assert_not_called()
+            cache.delete(thumbnails.failure_key(name))
+            get_post_picture(self.post)
+            executor.return_value.submit.assert_called_once()
+        thumbnails._pending.discard(name)
+
+    def test_modern_format_source(self):
+        """Варианты WebP выводятся отдельным <source> со своим srcset"""
+        render_thumbnails(self.post.image.name, [f'post:{self.post.id}'])
+        with mock.patch(
+            'posts.thumbnails.image_formats', return_value=('WEBP', 'JPEG')
+        ):
+            # Pillow здесь может не уметь WebP: ключи вариантов WebP
+            # записываются в хранилище напрямую, файлы шаблону не нужны.
+            for fmt, width, geometry, options in profile_variants('card'):
+                thumbnail = backend.thumbnail_file(
+                    self.post.image, geometry, **options
+                )
+                self.addCleanup(default.kvstore.delete, thumbnail)
+                if fmt == 'WEBP':
+                    thumbnail.set_size((width, width))
+                    default.kvstore.set(thumbnail)
+            picture = get_post_picture(self.post)
+            cache.clear()
+            response = self.authorized_client.get(
+                reverse('posts:post_detail', kwargs={'post_id': self.post.id})
+            )
+        [source] = picture.sources
+        self.assertEqual(source['type'], 'image/webp')
+        for width in THUMBNAIL_PROFILES['card']['widths']:
+            self.assertIn(f'.webp {width}w', source['srcset'])
+        self.assertContains(
+            response,
+            f'<source type="image/webp" srcset="{source["srcset"]}"',
+        )
+
+    def test_feed_thumbnails_are_resolved_in_one_batch(self):
+        """Миниатюры страницы ленты читаются одним запросом к хранилищу"""
+        for number in range(3):
+            Post.objects.create(
+                text=f'Пост с картинкой {number}',
+                author=self.user,
+                image=SimpleUploadedFile(
+                    name=f'batch{number}.gif',
+                    content=self.small_gif,
+                    content_type='image/gif'
+                ),
+            )
+        cache.clear()
+        lookups = default.kvstore.metrics().get('lookups', 0)
+        response = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(default.kvstore.metrics()['lookups'], lookups + 1)
+        self.assertEqual(len(response.context['post_pictures']), 4)
+
     def test_image_context_index(self):
         """Картинка передается на страницу index"""
         response = self.authorized_client.get(reverse('posts:index'))
@@ -311,6 +510,8 @@ class PaginatorViewsTest(TestCase):
         cls.post = Post.objects.bulk_create(objs)
 
     def setUp(self):
+        # bulk_create не шлёт сигналы, поэтому счётчики лент сбрасываем сами
+        cache.clear()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
 
@@ -355,3 +556,462 @@ class PaginatorViewsTest(TestCase):
             {'page': 2}
         )
         self.assertEqual(len(response.context['page_obj']), 3)
+
+    def test_cursor_pages_group_list(self):
+        """Проверка курсорной пагинации: 10 постов, затем 3 и возврат."""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        first_page = self.authorized_client.get(
+            url, {'cursor': ''}
+        ).context['page_obj']
+        self.assertEqual(len(first_page), 10)
+        self.assertFalse(first_page.has_previous())
+        second_page = self.authorized_client.get(
+            url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(second_page), 3)
+        self.assertFalse(second_page.has_next())
+        back_page = self.authorized_client.get(
+            url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertEqual(
+            set(first_page) | set(second_page),
+            set(Post.objects.filter(group=self.group))
+        )
+
+    @override_settings(POSTS_CURSOR_THRESHOLD=10)
+    def test_long_feed_switches_to_cursor(self):
+        """Длинная лента сама листается курсором, без ссылки на конец."""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        response = self.authorized_client.get(url)
+        page_obj = response.context['page_obj']
+        self.assertTrue(page_obj.paginator.is_cursor)
+        self.assertEqual(len(page_obj), 10)
+        self.assertContains(response, f'cursor={page_obj.next_cursor}')
+        response = self.authorized_client.get(url, {'page': 1})
+        self.assertEqual(len(response.context['page_obj']), 10)
+        self.assertContains(response, '?page=2')
+        self.assertNotContains(response, 'Последняя')
+
+    def test_cursor_broken_token_returns_first_page(self):
+        """Битый курсор открывает первую страницу."""
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': 'NoName'}),
+            {'cursor': 'not-a-cursor'}
+        )
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_page_count_is_cached_until_post_created(self):
+        """Число постов ленты кешируется и сбрасывается новым постом."""
+        url = reverse('posts:group_list', kwargs={'slug': 'test-slug'})
+        self.authorized_client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            count = self.authorized_client.get(
+                url
+            ).context['page_obj'].paginator.count
+        self.assertEqual(count, 13)
+        self.assertFalse(
+            [q for q in queries.captured_queries if 'COUNT(' in q['sql']]
+        )
+        Post.objects.create(
+            text='Ещё пост', author=self.user, group=self.group
+        )
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 14)
+
+    def test_paginator_renders_page_window(self):
+        """Навигация выводит только окно страниц вокруг текущей."""
+        Post.objects.bulk_create(
+            Post(text=f'Пост {e}', author=self.user) for e in range(60)
+        )
+        response = self.authorized_client.get(
+            reverse('posts:profile', kwargs={'username': 'NoName'}),
+            {'page': 4}
+        )
+        self.assertEqual(
+            list(response.context['page_obj'].paginator.page_window(4)),
+            [2, 3, 4, 5, 6]
+        )
+        self.assertContains(response, '?page=6')
+        self.assertNotContains(response, '?page=7"')
+        self.assertContains(response, '?page=8')
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='NoName')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+        Follow.objects.create(user=cls.reader, author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def revalidate(self, url):
+        etag = self.client.get(url)['ETag']
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_return_not_modified(self):
+        """Повторный запрос без изменений получает 304 без рендера."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:profile', kwargs={'username': 'NoName'}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+            reverse('posts:follow_index'),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.revalidate(url)
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(response.templates)
+                self.assertIn('Cookie', response['Vary'])
+
+    def test_writes_change_validators(self):
+        """Новый пост и новый комментарий меняют ETag страниц."""
+        follow_url = reverse('posts:follow_index')
+        detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}
+        )
+        follow_etag = self.client.get(follow_url)['ETag']
+        detail_etag = self.client.get(detail_url)['ETag']
+        Post.objects.create(text='Новый пост', author=self.user)
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=self.post
+        )
+        response = self.client.get(follow_url, HTTP_IF_NONE_MATCH=follow_etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(detail_url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_login_gets_fresh_csrf_token(self):
+        """После нового входа страница с формой не отдаётся из кеша"""
+        client = Client(enforce_csrf_checks=True)
+        login_url = reverse('users:login')
+
+        def login():
+            token = client.get(login_url).context['csrf_token']
+            client.post(login_url, {
+                'username': 'commenter',
+                'password': 'password',
+                'csrfmiddlewaretoken': token,
+            })
+
+        User.objects.create_user(username='commenter', password='password')
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        login()
+        etag = client.get(url)['ETag']
+        client.get(reverse('users:logout'))
+        login()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = client.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            {
+                'text': 'После входа',
+                'csrfmiddlewaretoken': response.context['csrf_token'],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            Comment.objects.filter(text='После входа').exists()
+        )
+
+    def test_login_is_not_answered_by_guest_date(self):
+        """Вошедший читатель не получает 304 по дате страницы гостя"""
+        url = reverse('posts:index')
+        guest = Client().get(url)
+        self.assertIn('Last-Modified', guest)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=guest['Last-Modified']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('Last-Modified', response)
+
+    def test_etag_depends_on_user(self):
+        """Разные пользователи получают разные ETag одной страницы."""
+        url = reverse('posts:index')
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(Client().get(url)['ETag'], etag)
+
+
+class SyndicationFeedTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='NoName')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост в группе', author=cls.author, group=cls.group
+        )
+        cls.other = Post.objects.create(
+            text='Пост без группы', author=cls.author
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def feed_urls(self):
+        return {
+            'posts:index_rss': {},
+            'posts:index_atom': {},
+            'posts:group_rss': {'slug': 'group'},
+            'posts:group_atom': {'slug': 'group'},
+            'posts:profile_rss': {'username': 'NoName'},
+            'posts:profile_atom': {'username': 'NoName'},
+        }
+
+    def test_feeds_list_posts(self):
+        """Ленты отдают посты своей выборки в RSS и Atom"""
+        for name, kwargs in self.feed_urls().items():
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, kwargs=kwargs))
+                self.assertEqual(response.status_code, 200)
+                kind = 'atom' if name.endswith('atom') else 'rss'
+                self.assertIn(kind, response['Content-Type'])
+                content = response.content.decode()
+                self.assertIn(self.post.text, content)
+                self.assertEqual(
+                    self.other.text in content, 'group' not in name
+                )
+
+    def test_unknown_group_or_author(self):
+        """Лента несуществующей группы или автора — 404"""
+        for name, kwargs in (
+            ('posts:group_rss', {'slug': 'missing'}),
+            ('posts:profile_atom', {'username': 'missing'}),
+        ):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name, kwargs=kwargs))
+                self.assertEqual(response.status_code, 404)
+
+    def test_cached_body_and_not_modified(self):
+        """Повторный опрос берёт тело из кеша или получает 304"""
+        url = reverse('posts:group_rss', kwargs={'slug': 'group'})
+        response = self.client.get(url)
+        with self.assertNumQueries(1):
+            cached = self.client.get(url)
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], response['ETag'])
+        self.assertEqual(cached['Last-Modified'], response['Last-Modified'])
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_cached_feed_is_per_host(self):
+        """Тело ленты с абсолютными ссылками кешируется для каждого хоста"""
+        url = reverse('posts:index_rss')
+        first = self.client.get(url, HTTP_HOST='localhost')
+        second = self.client.get(url, HTTP_HOST='testserver')
+        self.assertIn('http://localhost/', first.content.decode())
+        self.assertIn('http://testserver/', second.content.decode())
+        self.assertNotIn('http://localhost/', second.content.decode())
+        self.assertNotEqual(first['ETag'], second['ETag'])
+
+    def test_etag_is_shared_between_readers(self):
+        """ETag ленты не зависит от пользователя"""
+        url = reverse('posts:index_rss')
+        client = Client()
+        client.force_login(self.author)
+        response = client.get(url)
+        self.assertEqual(Client().get(url)['ETag'], response['ETag'])
+        self.assertNotIn('Vary', response)
+
+    def test_new_post_invalidates_feeds(self):
+        """Новый пост меняет ETag и попадает в закешированную ленту"""
+        for name, kwargs in self.feed_urls().items():
+            with self.subTest(name=name):
+                url = reverse(name, kwargs=kwargs)
+                etag = self.client.get(url)['ETag']
+                post = Post.objects.create(
+                    text=f'Свежий пост {name}',
+                    author=self.author,
+                    group=self.group,
+                )
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn(post.text, response.content.decode())
+
+
+class CommentPaginationTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Тестовый пост', author=cls.user)
+        cls.detail_url = reverse(
+            'posts:post_detail', kwargs={'post_id': cls.post.id}
+        )
+        cls.comments_url = reverse(
+            'posts:post_comments', kwargs={'post_id': cls.post.id}
+        )
+
+    def add_comments(self, count):
+        start = Comment.objects.count()
+        for number in range(start, start + count):
+            user = User.objects.create_user(username=f'commenter{number}')
+            Comment.objects.create(
+                post=self.post, author=user, text=f'Комментарий {number}'
+            )
+
+    def detail_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.detail_url)
+        return len(queries)
+
+    def test_first_chunk_is_limited(self):
+        """На странице поста только первая порция комментариев"""
+        self.add_comments(COMMENTS_PAGINATION + 5)
+        response = self.client.get(self.detail_url)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_PAGINATION)
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, self.comments_url)
+
+    def test_comments_do_not_add_queries(self):
+        """Число запросов не растёт с числом комментариев"""
+        self.add_comments(2)
+        queries = self.detail_queries()
+        self.add_comments(COMMENTS_PAGINATION)
+        self.assertEqual(self.detail_queries(), queries)
+
+    def test_next_chunk_fragment(self):
+        """Фрагмент отдаёт следующую порцию без повторов"""
+        self.add_comments(COMMENTS_PAGINATION + 5)
+        first = self.client.get(self.detail_url).context['comments']
+        response = self.client.get(
+            self.comments_url, {'cursor': first.next_cursor}
+        )
+        self.assertTemplateUsed(response, 'includes/comment_list.html')
+        second = response.context['comments']
+        self.assertEqual(len(second), 5)
+        self.assertFalse(second.has_next())
+        self.assertFalse(set(first) & set(second))
+        self.assertNotContains(response, 'Показать ещё')
+
+
+class ServerTimingTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='timed')
+        Post.objects.create(text='Тестовый пост', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_header_reports_request_parts(self):
+        """Server-Timing содержит базу, кеш, шаблоны и миниатюры"""
+        response = self.client.get(reverse('posts:index'))
+        metrics = dict(
+            metric.split(';', 1)
+            for metric in response['Server-Timing'].split(', ')
+        )
+        self.assertEqual(
+            set(metrics), {'db', 'cache', 'render', 'thumb', 'total'}
+        )
+        self.assertNotIn('desc="0 queries"', metrics['db'])
+        self.assertNotEqual(metrics['render'], 'dur=0.0')
+
+    def test_cache_hits_and_misses(self):
+        """Промахи холодного кеша становятся попаданиями на повторе"""
+        url = reverse('posts:index')
+        with self.assertLogs('core.timing', 'INFO') as logs:
+            self.client.get(url)
+            self.client.get(url)
+        cold, warm = (
+            json.loads(record.getMessage()) for record in logs.records
+        )
+        self.assertGreater(cold['cache_misses'], 0)
+        self.assertGreater(warm['cache_hits'], cold['cache_hits'])
+        self.assertLess(warm['db_queries'], cold['db_queries'])
+        self.assertEqual(warm['path'], url)
+
+
+class SearchViewTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(
+            username='writer', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Рыбалка', slug='fishing', description='Про рыбу'
+        )
+        cls.post = Post.objects.create(
+            text='Щука клюёт на рассвете', author=cls.user, group=cls.group
+        )
+        cls.url = reverse('posts:search')
+
+    def search(self, query, **params):
+        return self.client.get(self.url, {'q': query, **params})
+
+    def found(self, query):
+        return list(self.search(query).context['page_obj'])
+
+    def test_search_by_text_author_and_group(self):
+        """Пост находится по тексту, имени автора и названию группы"""
+        for query in ('щука', 'рассвет', 'Толстой', 'рыбалка'):
+            with self.subTest(query=query):
+                self.assertEqual(self.found(query), [self.post])
+
+    def test_index_follows_changes(self):
+        """Индекс следует за правкой и удалением постов и групп"""
+        Post.objects.filter(pk=self.post.pk).update(text='Окунь в камышах')
+        self.assertEqual(self.found('щука'), [])
+        self.assertEqual(self.found('окунь'), [self.post])
+        Group.objects.filter(pk=self.group.pk).update(title='Охота')
+        self.assertEqual(self.found('охота'), [self.post])
+        Post.objects.filter(pk=self.post.pk).delete()
+        self.assertEqual(self.found('окунь'), [])
+
+    def test_ranked_by_relevance(self):
+        """Пост, где слово встречается чаще, выше в выдаче"""
+        best = Post.objects.create(
+            text='Щука, щука и ещё щука', author=self.user
+        )
+        self.assertEqual(self.found('щука'), [best, self.post])
+
+    def test_cursor_pagination(self):
+        """Выдача листается курсором вперёд и назад"""
+        Post.objects.bulk_create([
+            Post(text=f'Щука номер {number}', author=self.user)
+            for number in range(15)
+        ])
+        response = self.search('щука')
+        first = response.context['page_obj']
+        self.assertEqual(len(first), 10)
+        self.assertTrue(first.has_next())
+        self.assertContains(response, f'cursor={first.next_cursor}')
+        self.assertContains(response, 'q=%D1%89%D1%83%D0%BA%D0%B0')
+        second = self.search('щука', cursor=first.next_cursor).context[
+            'page_obj'
+        ]
+        self.assertEqual(len(second), 6)
+        self.assertFalse(second.has_next())
+        self.assertFalse(set(first) & set(second))
+        back = self.search('щука', cursor=second.previous_cursor).context[
+            'page_obj'
+        ]
+        self.assertEqual(list(back), list(first))
+
+    def test_query_syntax_is_escaped(self):
+        """Операторы FTS5 во вводе не ломают поиск"""
+        for query in ('щука"', 'NEAR(щука', 'щука OR', '*', '"'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query).status_code, 200)
+
+    def test_rebuild_search_index(self):
+        """Команда заново индексирует существующие посты"""
+        out = StringIO()
+        call_command('rebuild_search_index', batch_size=1, stdout=out)
+        self.assertIn('Проиндексировано постов: 1', out.getvalue())
+        self.assertEqual(self.found('щука'), [self.post])
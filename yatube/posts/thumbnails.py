@@ -0,0 +1,295 @@
+"""Миниатюры картинок постов, которые готовятся заранее.
+
+Для каждого профиля (THUMBNAIL_PROFILES) готовится несколько ширин в
+JPEG и в современных форматах (WebP, AVIF), если их умеет Pillow; шаблон
+собирает из них <picture> с srcset.
+
+post_create и post_edit ставят нужные геометрии в очередь пула потоков,
+как только картинка сохранена. Шаблоны только смотрят в хранилище
+ключей sorl: есть готовая миниатюра — выводят её, нет — показывают
+заглушку и ставят пост в очередь. Ресайза внутри запроса не бывает.
+Картинку, миниатюры которой не получились, снова ставят в очередь не
+раньше чем через POSTS_THUMBNAIL_RETRY_TIMEOUT секунд.
+Для страницы ленты все ключи читаются одним пакетом (get_post_pictures).
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from PIL import Image
+from sorl.thumbnail import base, default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.helpers import serialize, tokey
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from core.timing import timed
+
+from .models import Post
+from .utils import bump_feed_versions
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_PROFILES = {
+    'card': {
+        'size': (960, 339),
+        'widths': (480, 768, 960),
+        'options': {'crop': 'center', 'upscale': True},
+    },
+}
+FALLBACK_FORMAT = 'JPEG'
+MODERN_FORMATS = ('AVIF', 'WEBP')
+MIME_TYPES = {
+    'AVIF': 'image/avif',
+    'WEBP': 'image/webp',
+    'JPEG': 'image/jpeg',
+}
+EXTENSIONS = {**base.EXTENSIONS, 'AVIF': 'avif'}
+
+
+@lru_cache(maxsize=None)
+def image_formats():
+    """Форматы миниатюр, которые умеет записывать установленный Pillow."""
+    Image.init()
+    return tuple(
+        fmt for fmt in MODERN_FORMATS if fmt in Image.SAVE
+    ) + (FALLBACK_FORMAT,)
+
+
+def profile_variants(profile):
+    """Все варианты профиля: (формат, ширина, геометрия, опции sorl)."""
+    width, height = THUMBNAIL_PROFILES[profile]['size']
+    options = THUMBNAIL_PROFILES[profile]['options']
+    return [
+        (
+            fmt,
+            variant_width,
+            f'{variant_width}x{round(height * variant_width / width)}',
+            {**options, 'format': fmt},
+        )
+        for fmt in image_formats()
+        for variant_width in THUMBNAIL_PROFILES[profile]['widths']
+    ]
+
+
+class Picture:
+    """Готовые варианты миниатюры для тега <picture>."""
+
+    def __init__(self, variants):
+        self.variants = variants
+
+    def _srcset(self, fmt):
+        return ', '.join(
+            f'{thumbnail.url} {width}w'
+            for width, thumbnail in sorted(self.variants[fmt])
+        )
+
+    @property
+    def img(self):
+        return max(self.variants[FALLBACK_FORMAT])[1]
+
+    @property
+    def srcset(self):
+        return self._srcset(FALLBACK_FORMAT)
+
+    @property
+    def sources(self):
+        return [
+            {'type': MIME_TYPES[fmt], 'srcset': self._srcset(fmt)}
+            for fmt in MODERN_FORMATS if fmt in self.variants
+        ]
+
+
+class EagerThumbnailBackend(ThumbnailBackend):
+    """Бэкенд sorl, который умеет назвать миниатюру, не создавая её."""
+
+    def _get_thumbnail_filename(self, source, geometry_string, options):
+        key = tokey(source.key, geometry_string, serialize(options))
+        path = f'{key[:2]}/{key[2:4]}/{key}'
+        return '%s%s.%s' % (
+            thumbnail_settings.THUMBNAIL_PREFIX, path,
+            EXTENSIONS[options['format']],
+        )
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+backend = EagerThumbnailBackend()
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+    return _executor
+
+
+def post_image_feeds(post):
+    """Кешируемые ленты и страницы, на которых видна картинка поста."""
+    from .signals import cached_feeds
+
+    return [f'post:{post.pk}', *cached_feeds(post.author_id, post.group_id)]
+
+
+@timed('thumb')
+def render_thumbnails(name, feeds):
+    """Готовит все миниатюры картинки и сбрасывает кеш лент с ней.
+
+    Работает только с хранилищем файлов и sorl, без запросов к постам,
+    поэтому годится для фонового потока.
+    """
+    source = ImageFile(name, Post._meta.get_field('image').storage)
+    for profile in THUMBNAIL_PROFILES:
+        for fmt, width, geometry, options in profile_variants(profile):
+            backend.get_thumbnail(source, geometry, **options)
+    bump_feed_versions(*feeds)
+
+
+def failure_key(name):
+    return f'posts:thumbnail_failed:{name}'
+
+
+def _render_in_worker(name, feeds):
+    try:
+        render_thumbnails(name, feeds)
+    except Exception:
+        logger.exception('Не удалось подготовить миниатюры %s', name)
+        cache.set(
+            failure_key(name), True, settings.POSTS_THUMBNAIL_RETRY_TIMEOUT
+        )
+    finally:
+        with _lock:
+            _pending.discard(name)
+        connections.close_all()
+
+
+def _submit(post):
+    name = post.image.name
+    if cache.get(failure_key(name)):
+        return
+    with _lock:
+        if name in _pending:
+            return
+        _pending.add(name)
+    get_executor().submit(_render_in_worker, name, post_image_feeds(post))
+
+
+def queue_thumbnails(post):
+    """Ставит миниатюры поста в очередь после фиксации транзакции.
+
+    При POSTS_THUMBNAIL_WORKERS = 0 миниатюры готовятся сразу в текущем
+    потоке, это удобно для отладки и тестов.
+    """
+    if not post.image:
+        return
+    if settings.POSTS_THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: _submit(post))
+    else:
+        transaction.on_commit(lambda: render_thumbnails(
+            post.image.name, post_image_feeds(post)
+        ))
+
+
+def get_cached_images(image_files):
+    """Достаёт из хранилища ключей sorl сразу несколько картинок.
+
+    Возвращает словарь ключ картинки -> ImageFile или None. Хранилища
+    с методом get_raw_many отвечают одним обращением.
+    """
+    kvstore = default.kvstore
+    raw_keys = {add_prefix(image_file.key): image_file.key
+                for image_file in image_files}
+    if hasattr(kvstore, 'get_raw_many'):
+        values = kvstore.get_raw_many(list(raw_keys))
+    else:
+        values = {raw_key: kvstore._get_raw(raw_key) for raw_key in raw_keys}
+    return {
+        key: deserialize_image_file(values[raw_key])
+        if values.get(raw_key) else None
+        for raw_key, key in raw_keys.items()
+    }
+
+
+@timed('thumb')
+def get_post_pictures(posts, profile='card'):
+    """Готовые миниатюры для всех постов страницы одним пакетом.
+
+    Возвращает словарь id поста -> Picture или None, пока основного
+    варианта нет. Посты с недостающими вариантами снова ставятся в
+    очередь.
+    """
+    wanted = {}
+    for post in posts:
+        if not post.image:
+            continue
+        wanted[post.pk] = [
+            (fmt, width, backend.thumbnail_file(
+                post.image, geometry, **options
+            ))
+            for fmt, width, geometry, options in profile_variants(profile)
+        ]
+    if not wanted:
+        return {}
+    cached = get_cached_images(
+        thumbnail for variants in wanted.values()
+        for fmt, width, thumbnail in variants
+    )
+    pictures = {}
+    for post in posts:
+        if post.pk not in wanted:
+            continue
+        variants = {}
+        for fmt, width, thumbnail in wanted[post.pk]:
+            thumbnail = cached[thumbnail.key]
+            if thumbnail is not None:
+                variants.setdefault(fmt, []).append((width, thumbnail))
+        found = sum(len(thumbnails) for thumbnails in variants.values())
+        if found < len(wanted[post.pk]) and settings.POSTS_THUMBNAIL_WORKERS:
+            _submit(post)
+        pictures[post.pk] = (
+            Picture(variants) if FALLBACK_FORMAT in variants else None
+        )
+    return pictures
+
+
+def get_post_picture(post, profile='card'):
+    """Готовые варианты миниатюры одного поста или None."""
+    return get_post_pictures([post], profile).get(post.pk)
+
+
+def release_image(name):
+    """Удаляет картинку и её миниатюры, когда на неё не ссылается ни один пост.
+
+    Одинаковые картинки хранятся одним файлом (posts.storage), поэтому
+    файл удаляется только вместе с последней ссылкой на него. Сигналы
+    освобождают только файлы с адресацией по содержимому: старые имена
+    из плоского каталога освобождает migrate_image_paths.
+    """
+    if not name or Post.objects.filter(image=name).exists():
+        return
+    backend.delete(ImageFile(name, Post._meta.get_field('image').storage))
@@ -0,0 +1,84 @@
+"""Материализованная лента подписок (fan-out on write).
+
+Новый пост сразу раскладывается по лентам подписчиков автора, поэтому
+страница подписок читает записи одного пользователя по индексу
+(user, -pub_date) без соединения Post с Follow.
+"""
+from itertools import groupby, islice
+from operator import itemgetter
+
+from django.db import transaction
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE: int = 1000
+
+
+def _bulk_insert(entries):
+    entries = iter(entries)
+    batch = list(islice(entries, BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, BATCH_SIZE))
+
+
+def fan_out(post, follower_ids):
+    """Добавляет пост в ленты подписчиков его автора."""
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in follower_ids
+    )
+
+
+def backfill(user_id, author_id):
+    """Переносит в ленту читателя посты автора, на которого он подписался."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def drop(user_id, author_id):
+    """Убирает из ленты читателя посты автора, от которого он отписался."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты пользователей с нуля и возвращает их число.
+
+    Лента читателя стирается и заполняется заново в одной транзакции,
+    поэтому во время пересборки никто не видит пустой или неполной
+    ленты. Ленты читателей без подписок просто очищаются.
+    """
+    follows = Follow.objects.order_by('user_id').values_list(
+        'user_id', 'author_id'
+    )
+    stale = TimelineEntry.objects.exclude(
+        user_id__in=Follow.objects.values('user_id')
+    )
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        stale = stale.filter(user_id__in=user_ids)
+    users = 0
+    follows = follows.iterator(chunk_size=BATCH_SIZE)
+    for user_id, user_follows in groupby(follows, key=itemgetter(0)):
+        with transaction.atomic():
+            TimelineEntry.objects.filter(user_id=user_id).delete()
+            for _, author_id in user_follows:
+                backfill(user_id, author_id)
+        users += 1
+    stale.delete()
+    return users
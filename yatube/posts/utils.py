@@ -1,11 +1,363 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+import json
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.paginator import Paginator, Page
+from django.db import connection
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
 
 PAGINATION: int = 10
+COMMENTS_PAGINATION: int = 20
+CURSOR_PARAM: str = 'cursor'
+PAGE_WINDOW: int = 2
+COUNT_CACHE_TIMEOUT: int = 60 * 15
+FEED_CACHE_TIMEOUT: int = 60 * 60 * 24
+ESTIMATE_THRESHOLD: int = 100000
+
+
+def shared_timeout(timeout):
+    """Срок жизни ключа, который должны видеть все процессы сайта.
+
+    Поколения лент, счётчики и фрагменты сбрасываются записью в одном
+    процессе. Кеш в памяти процесса (locmem) этого сброса в других
+    процессах не видит, поэтому на нём такие ключи живут не дольше
+    POSTS_LOCAL_CACHE_TIMEOUT: на столько воркеры и могут разойтись.
+    На общем кеше (memcached) срок не урезается.
+    """
+    if not isinstance(caches['default'], LocMemCache):
+        return timeout
+    limit = settings.POSTS_LOCAL_CACHE_TIMEOUT
+    return limit if timeout is None else min(timeout, limit)
+
+
+def feed_count_key(feed):
+    return f'posts:count:{feed}'
+
+
+def invalidate_feed_counts(*feeds):
+    """Сбрасывает закешированное число постов в перечисленных лентах."""
+    cache.delete_many([feed_count_key(feed) for feed in feeds])
+
+
+def feed_version_key(feed):
+    return f'posts:version:{feed}'
+
+
+def get_feed_version(feed):
+    """Текущее поколение ленты; новое поколение делает старый кеш мёртвым.
+
+    Начальное значение берётся из времени, чтобы после вытеснения ключа
+    версия не вернулась к уже использованному числу.
+    """
+    key = feed_version_key(feed)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, int(time.time() * 1000), shared_timeout(None))
+        version = cache.get(key)
+    return version
+
+
+def feed_changed_key(feed):
+    return f'posts:changed:{feed}'
+
+
+def bump_feed_versions(*feeds):
+    for feed in feeds:
+        try:
+            cache.incr(feed_version_key(feed))
+        except ValueError:
+            get_feed_version(feed)
+    now = time.time()
+    cache.set_many(
+        {feed_changed_key(feed): now for feed in feeds},
+        shared_timeout(None)
+    )
+
+
+def get_feed_state(*feeds):
+    """Поколения лент и время последней записи в любую из них.
+
+    Время записи отмечается при каждом сдвиге поколения, поэтому оно
+    учитывает и правки, и удаления, а не только дату новейшего поста.
+    Если отметка вытеснена из кеша, лента считается изменённой сейчас.
+    """
+    cached = cache.get_many(
+        [feed_version_key(feed) for feed in feeds]
+        + [feed_changed_key(feed) for feed in feeds]
+    )
+    versions = {}
+    missing = {}
+    changed = 0
+    for feed in feeds:
+        versions[feed] = (
+            cached.get(feed_version_key(feed)) or get_feed_version(feed)
+        )
+        stamp = cached.get(feed_changed_key(feed))
+        if stamp is None:
+            stamp = missing[feed_changed_key(feed)] = time.time()
+        changed = max(changed, stamp)
+    if missing:
+        cache.set_many(missing, shared_timeout(None))
+    return versions, changed
+
+
+def feed_cache_context(feed, page_obj):
+    """Ключ кеша фрагмента ленты: лента, её поколение и страница.
+
+    Для курсорной страницы берётся разобранный курсор, а не сам токен:
+    битые и по-разному записанные токены одной страницы не плодят
+    отдельные записи в кеше.
+    """
+    page = page_obj.number
+    if page is None:
+        cursor = decode_cursor(page_obj.cursor) if page_obj.cursor else None
+        page = 'cursor:' + (
+            '' if cursor is None
+            else f'{cursor[0]}:{cursor[1].isoformat()}:{cursor[2]}'
+        )
+    return {
+        'feed_cache_key': f'{feed}:{get_feed_version(feed)}:{page}',
+        'feed_cache_timeout': shared_timeout(FEED_CACHE_TIMEOUT),
+    }
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Временно отключает auto_now_add у полей дат.
+
+    Нужна при массовой загрузке: иначе bulk_create проставит всем
+    строкам текущее время вместо переданных дат.
+    """
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in saved:
+            field.auto_now_add = auto_now_add
+
+
+def pack_token(values):
+    """Упаковывает список значений в непрозрачный токен для URL."""
+    raw = json.dumps(values)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def unpack_token(token):
+    """Распаковывает токен, для битого токена возвращает None."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def encode_cursor(date, pk, direction):
+    """Упаковывает ключ (дата, id) в непрозрачный токен для URL."""
+    return pack_token([direction, date.isoformat(), pk])
+
+
+def decode_cursor(token):
+    """Распаковывает токен курсора, для битого токена возвращает None."""
+    values = unpack_token(token)
+    if values is None or len(values) != 3:
+        return None
+    direction, date, pk = values
+    date = parse_datetime(date) if isinstance(date, str) else None
+    if direction not in ('next', 'prev') or date is None:
+        return None
+    if not isinstance(pk, int):
+        return None
+    return direction, date, pk
+
+
+class CachedCountPaginator(Paginator):
+    """Нумерованный пагинатор с кешированным COUNT(*) ленты.
+
+    Имя ленты (``index``, ``group:<id>``, ``author:<id>``,
+    ``follow:<user_id>``) задаёт ключ кеша; сигналы в posts.signals
+    сбрасывают его при создании и удалении постов и подписок.
+    """
+
+    def __init__(self, object_list, per_page, feed=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.feed = feed
+
+    @cached_property
+    def count(self):
+        if self.feed is None:
+            return super().count
+        key = feed_count_key(self.feed)
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, shared_timeout(COUNT_CACHE_TIMEOUT))
+        return count
+
+    @property
+    def prefers_cursor(self):
+        """Лента слишком длинная для страниц с OFFSET."""
+        return self.count > settings.POSTS_CURSOR_THRESHOLD
+
+    def page_window(self, number, on_each_side=PAGE_WINDOW):
+        """Номера страниц вокруг текущей вместо полного page_range."""
+        first = max(number - on_each_side, 1)
+        last = min(number + on_each_side, self.num_pages)
+        return range(first, last + 1)
+
+
+def estimated_count(model):
+    """Примерное число строк таблицы из статистики планировщика.
+
+    Для SQLite это sqlite_stat1 после ANALYZE, для PostgreSQL —
+    pg_class.reltuples. Если статистики нет, возвращает None.
+    """
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+            )
+            if cursor.fetchone() is None:
+                return None
+            cursor.execute(
+                'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+                [table]
+            )
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [table]
+            )
+            row = cursor.fetchone()
+            return int(row[0]) if row and row[0] >= 0 else None
+    return None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не считает COUNT(*) по большой таблице целиком.
+
+    Для запроса без фильтров берётся оценка из статистики; точный
+    COUNT(*) остаётся для фильтров и для таблиц меньше
+    ESTIMATE_THRESHOLD строк, где он дёшев.
+    """
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            estimate = estimated_count(self.object_list.model)
+            if estimate is not None and estimate >= ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации: без номеров и без COUNT(*)."""
+
+    def __init__(self, object_list, paginator, cursor, next_cursor,
+                 previous_cursor):
+        super().__init__(object_list, None, paginator)
+        self.cursor = cursor
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator:
+    """Keyset-пагинация по паре (дата, id) от новых записей к старым.
+
+    Каждая страница выбирается одним запросом с LIMIT per_page + 1,
+    поэтому глубина страницы не влияет на стоимость запроса.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, date_field='pub_date'):
+        self.object_list = object_list
+        self.per_page = per_page
+        self.date_field = date_field
+
+    def _key(self, obj):
+        return getattr(obj, self.date_field), obj.pk
+
+    def _after(self, date, pk):
+        return Q(**{f'{self.date_field}__lte': date}) & (
+            Q(**{f'{self.date_field}__lt': date}) | Q(pk__lt=pk)
+        )
+
+    def _before(self, date, pk):
+        return Q(**{f'{self.date_field}__gte': date}) & (
+            Q(**{f'{self.date_field}__gt': date}) | Q(pk__gt=pk)
+        )
+
+    def get_page(self, token):
+        cursor = decode_cursor(token) if token else None
+        descending = (f'-{self.date_field}', '-pk')
+        ascending = (self.date_field, 'pk')
+        if cursor is None:
+            rows = list(
+                self.object_list.order_by(*descending)[:self.per_page + 1]
+            )
+            has_more, has_less = len(rows) > self.per_page, False
+            rows = rows[:self.per_page]
+        elif cursor[0] == 'next':
+            rows = list(
+                self.object_list.filter(self._after(*cursor[1:]))
+                .order_by(*descending)[:self.per_page + 1]
+            )
+            has_more, has_less = len(rows) > self.per_page, True
+            rows = rows[:self.per_page]
+        else:
+            rows = list(
+                self.object_list.filter(self._before(*cursor[1:]))
+                .order_by(*ascending)[:self.per_page + 1]
+            )
+            has_more, has_less = True, len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+        next_cursor = previous_cursor = None
+        if rows and has_more:
+            next_cursor = encode_cursor(*self._key(rows[-1]), 'next')
+        if rows and has_less:
+            previous_cursor = encode_cursor(*self._key(rows[0]), 'prev')
+        return CursorPage(
+            rows, self, token or '', next_cursor, previous_cursor
+        )
+
 
+def get_page_obj(request, list_of_objects, feed=None):
+    """Страница ленты.
 
-def get_page_obj(request, list_of_objects):
-    paginator = Paginator(list_of_objects, PAGINATION)
+    Короткие ленты листаются по номерам, число постов ленты ``feed``
+    берётся из кеша. Ленты длиннее POSTS_CURSOR_THRESHOLD и запросы с
+    параметром ``cursor`` отдаются курсорными страницами, которым не
+    нужен OFFSET. Явный ``page`` оставлен для старых ссылок.
+    """
     page_number = request.GET.get('page')
+    paginator = CachedCountPaginator(list_of_objects, PAGINATION, feed=feed)
+    if CURSOR_PARAM in request.GET or (
+        page_number is None and paginator.prefers_cursor
+    ):
+        paginator = CursorPaginator(list_of_objects, PAGINATION)
+        return paginator.get_page(request.GET.get(CURSOR_PARAM))
     page_obj = paginator.get_page(page_number)
     return page_obj
@@ -1,39 +1,118 @@
+import os
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth import get_user_model
 from django.shortcuts import redirect
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
+from sorl.thumbnail import default
 
-from .models import Post, Group, Follow
+from .models import Comment, Post, Group, Follow
 from .forms import PostForm, CommentForm
-from .utils import get_page_obj
+from .conditional import conditional_feed
+from .exporting import CONTENT_TYPES, EXPORTS, export_lines
+from .thumbnails import queue_thumbnails
+from .search import search_posts
+from .utils import (
+    COMMENTS_PAGINATION, CURSOR_PARAM, PAGINATION, CursorPaginator,
+    feed_cache_context, get_page_obj,
+)
 
 User = get_user_model()
 
 
+def get_comments_page(post_id, cursor):
+    """Порция комментариев поста от новых к старым, с авторами."""
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    paginator = CursorPaginator(
+        comments, COMMENTS_PAGINATION, date_field='created'
+    )
+    return paginator.get_page(cursor)
+
+
+def viewer_feeds(request):
+    if request.user.is_authenticated:
+        return [f'follow:{request.user.pk}']
+    return []
+
+
+def group_feeds(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    return None if group_id is None else [f'group:{group_id}']
+
+
+def profile_feeds(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return [
+        f'author:{author_id}', f'followers:{author_id}',
+        *viewer_feeds(request),
+    ]
+
+
+def detail_feeds(request, post_id):
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return [f'post:{post_id}', f'author:{author_id}']
+
+
+def follow_feeds(request):
+    if not request.user.is_authenticated:
+        return None
+    authors = Follow.objects.filter(user=request.user).values_list(
+        'author_id', flat=True
+    )
+    return [
+        *viewer_feeds(request),
+        *(f'author:{author_id}' for author_id in authors),
+    ]
+
+
+@conditional_feed(lambda request: ['index'])
 def index(request):
     post_list = Post.objects.select_related('author', 'group')
-    page_obj = get_page_obj(request, post_list)
+    page_obj = get_page_obj(request, post_list, feed='index')
     context = {
         'page_obj': page_obj,
+        **feed_cache_context('index', page_obj),
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_feed(group_feeds)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
     post_list = group.posts.select_related('author', 'group')
-    page_obj = get_page_obj(request, post_list)
+    feed = f'group:{group.pk}'
+    page_obj = get_page_obj(request, post_list, feed=feed)
     context = {
         'group': group,
         'page_obj': page_obj,
+        **feed_cache_context(feed, page_obj),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_feed(profile_feeds)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('profile'), username=username
+    )
     post_list = author.posts.select_related('author', 'group')
-    page_obj = get_page_obj(request, post_list)
+    feed = f'author:{author.pk}'
+    page_obj = get_page_obj(request, post_list, feed=feed)
     following = (
         request.user.is_authenticated
         and Follow.objects.filter(
@@ -46,23 +125,39 @@ def profile(request, username):
         'author': author,
         'page_obj': page_obj,
         'following': following,
+        **feed_cache_context(feed, page_obj),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_feed(detail_feeds)
 def post_detail(request, post_id):
     form = CommentForm(request.POST or None)
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__profile', 'group'), pk=post_id
+    )
     context = {
         'post_id': post_id,
         'post': post,
         'form': form,
-        'comments': comments,
+        'comments': get_comments_page(post_id, None),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@conditional_feed(detail_feeds)
+def post_comments(request, post_id):
+    """Следующая порция комментариев поста фрагментом HTML."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    context = {
+        'post_id': post_id,
+        'comments': get_comments_page(
+            post_id, request.GET.get(CURSOR_PARAM)
+        ),
+    }
+    return render(request, 'includes/comment_list.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -70,6 +165,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        queue_thumbnails(post)
         return redirect('posts:profile', username=request.user.username)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -86,6 +182,8 @@ def post_edit(request, post_id):
     )
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            queue_thumbnails(post)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -108,16 +206,37 @@ def add_comment(request, post_id):
 
 
 @login_required
+@conditional_feed(follow_feeds)
 def follow_index(request):
     """Страница подписок"""
-    post_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = get_page_obj(request, post_list)
+    entries = request.user.timeline.select_related(
+        'post__author', 'post__group'
+    )
+    page_obj = get_page_obj(
+        request, entries, feed=f'follow:{request.user.pk}'
+    )
+    page_obj.object_list = [entry.post for entry in page_obj]
     context = {
         'page_obj': page_obj,
     }
     return render(request, 'posts/follow.html', context)
 
 
+def search(request):
+    """Поиск по тексту постов, авторам и группам"""
+    query = request.GET.get('q', '').strip()
+    page_obj = None
+    if query:
+        page_obj = search_posts(
+            query, request.GET.get(CURSOR_PARAM), PAGINATION
+        )
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def profile_follow(request, username):
     """Подписка"""
@@ -136,3 +255,33 @@ def profile_unfollow(request, username):
         if follow.exists():
             follow.delete()
     return redirect('posts:follow_index')
+
+
+def thumbnail_metrics(request):
+    """Счётчики хранилища ключей sorl этого процесса для скрейпера."""
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        raise Http404
+    metrics = getattr(default.kvstore, 'metrics', dict)()
+    lines = [
+        f'yatube_thumbnail_kvstore_{name}{{pid="{os.getpid()}"}} {value}'
+        for name, value in sorted(metrics.items())
+    ]
+    return HttpResponse(
+        ''.join(f'{line}\n' for line in lines),
+        content_type='text/plain; version=0.0.4'
+    )
+
+
+@staff_member_required
+def export(request, kind):
+    """Потоковая выгрузка постов или комментариев для сотрудников."""
+    fmt = request.GET.get('format', 'jsonl')
+    if kind not in EXPORTS or fmt not in CONTENT_TYPES:
+        raise Http404
+    response = StreamingHttpResponse(
+        export_lines(kind, fmt), content_type=CONTENT_TYPES[fmt]
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{kind}s.{fmt}"'
+    )
+    return response
@@ -0,0 +1,14 @@
+// Подгружает следующую порцию комментариев вместо ссылки «Показать ещё».
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('.comments-more');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.href, {credentials: 'same-origin'})
+    .then(function (response) { return response.text(); })
+    .then(function (html) {
+      link.insertAdjacentHTML('afterend', html);
+      link.remove();
+    });
+});
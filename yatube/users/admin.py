@@ -0,0 +1,22 @@
+from django.contrib import admin
+from django.contrib.auth import admin as auth_admin
+from django.contrib.auth import get_user_model
+
+from core.admin import PrefixSearchMixin
+
+User = get_user_model()
+
+
+class UserAdmin(PrefixSearchMixin, auth_admin.UserAdmin):
+    """Пользователи ищутся по префиксу имени или почты.
+
+    В отличие от стандартного поиска Django, имя и фамилия не
+    просматриваются, а регистр учитывается: зато оба поля идут по
+    индексу (почта — из миграции users.0001).
+    """
+    prefix_search_fields = ('username', 'email')
+    show_full_result_count = False
+
+
+admin.site.unregister(User)
+admin.site.register(User, UserAdmin)
@@ -0,0 +1,15 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX auth_user_email_idx ON auth_user (email)',
+            reverse_sql='DROP INDEX auth_user_email_idx',
+        ),
+    ]
@@ -32,13 +32,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -46,7 +49,8 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
+        'NAME': 'django',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -111,8 +115,71 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# locmem живёт в памяти одного процесса: поколения лент, счётчики и
+# фрагменты на нём хранятся не дольше POSTS_LOCAL_CACHE_TIMEOUT секунд,
+# чтобы воркеры не расходились надолго. При нескольких процессах лучше
+# общий кеш, тогда сроки не урезаются:
+# 'BACKEND': 'core.cache.TimedMemcachedCache', 'LOCATION': '127.0.0.1:11211'
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache.TimedLocMemCache',
     }
 }
+POSTS_LOCAL_CACHE_TIMEOUT = 30
+
+POSTS_THUMBNAIL_WORKERS = 2
+# Сколько секунд не пробовать снова картинку, миниатюры которой не вышли.
+POSTS_THUMBNAIL_RETRY_TIMEOUT = 300
+POSTS_IMAGE_MAX_PIXELS = 50 * 10 ** 6
+POSTS_IMAGE_MAX_SIDE = 2560
+# Ленты длиннее этого числа постов листаются курсором, без OFFSET.
+POSTS_CURSOR_THRESHOLD = 1000
+
+INTERNAL_IPS = ['127.0.0.1']
+
+THUMBNAIL_KVSTORE = 'posts.kvstore.SQLiteKVStore'
+POSTS_THUMBNAIL_KVSTORE_PATH = os.path.join(BASE_DIR, 'thumbnails.sqlite3')
+POSTS_THUMBNAIL_LRU_SIZE = 10000
+# LRU свой у каждого процесса; чужие удаления видны через столько секунд.
+POSTS_THUMBNAIL_LRU_TTL = 60
+
+# Наибольшее число запросов к базе на один запрос к странице по имени URL.
+# Считается для авторизованного пользователя с холодным кешем; для
+# страниц записи — на POST, для выгрузки — с чтением всего ответа.
+QUERY_BUDGETS = {
+    'posts:index': 4,
+    'posts:group_list': 6,
+    'posts:profile': 7,
+    'posts:post_detail': 5,
+    'posts:post_create': 5,
+    'posts:post_edit': 8,
+    'posts:post_comments': 5,
+    'posts:add_comment': 6,
+    'posts:follow_index': 5,
+    'posts:search': 4,
+    'posts:profile_follow': 11,
+    'posts:profile_unfollow': 9,
+    'posts:thumbnail_metrics': 0,
+    'posts:export': 3,
+    'posts:index_rss': 1,
+    'posts:index_atom': 1,
+    'posts:group_rss': 3,
+    'posts:group_atom': 3,
+    'posts:profile_rss': 3,
+    'posts:profile_atom': 3,
+    'users:signup': 2,
+    'users:logout': 4,
+    'users:login': 2,
+    'users:password_change': 2,
+    'users:password_change_done': 2,
+    'users:password_reset_form': 2,
+    'users:password_reset_done': 2,
+    'users:password_reset_confirm': 3,
+    'users:password_reset_complete': 2,
+}
+QUERY_BUDGET_ACTION = 'warn'
+
+# Каталог профилей запросов; пока он не задан, профилирование выключено.
+PROFILING_DIR = None
+PROFILING_KEEP = 50
+PROFILING_TOKEN_MAX_AGE = 60 * 60